@@ -71,26 +71,24 @@ li {
 
 table {
     width: 100%;
-    border-collapse: collapse;
+    border-collapse: separate;
+    border-spacing: 0;
+    border: 1px solid #999;
     margin: 1em 0;
     font-size: 11pt;
 }
 
 th, td {
-    border: 1px solid #999;
     padding: 0.5em;
     text-align: left;
 }
 
 th {
     background-color: #f0f0f0;
+    border-bottom: 1px solid #999;
     font-weight: bold;
 }
 
-tr:nth-child(even) {
-    background-color: #f9f9f9;
-}
-
 hr {
     border: none;
     border-top: 1px solid #ccc;
@@ -109,7 +107,6 @@ pre {
     background-color: #f4f4f4;
     padding: 1em;
     border-radius: 5px;
-    overflow-x: auto;
     font-size: 10pt;
 }
 
@@ -130,6 +127,9 @@ em {
 }
 """
 
+# Compiled once at import so repeated conversions don't re-tokenize the stylesheet
+_CSS = CSS(string=PAPER_CSS)
+
 
 def convert_md_to_pdf(input_path: str, output_path: str = None) -> str:
     """
@@ -156,9 +156,10 @@ def convert_md_to_pdf(input_path: str, output_path: str = None) -> str:
     md_content = input_file.read_text(encoding='utf-8')
 
     # Convert markdown to HTML with extensions for tables
+    # (no 'toc': the stylesheet never renders a table of contents)
     html_content = markdown.markdown(
         md_content,
-        extensions=['tables', 'fenced_code', 'toc']
+        extensions=['tables', 'fenced_code']
     )
 
     # Wrap in full HTML document
@@ -176,28 +177,38 @@ def convert_md_to_pdf(input_path: str, output_path: str = None) -> str:
     """
 
     # Convert to PDF
-    html = HTML(string=full_html)
-    css = CSS(string=PAPER_CSS)
-    html.write_pdf(str(output_path), stylesheets=[css])
+    html = HTML(string=full_html, base_url=str(input_file.parent))
+    html.write_pdf(str(output_path), stylesheets=[_CSS])
 
     return str(output_path)
 
 
 def main():
-    """Main entry point."""
+    """
+    Main entry point.
+
+    Usage:
+        python md_to_pdf.py [input.md [output.pdf]]
+        python md_to_pdf.py a.md b.md "docs/*.md"
+    """
     import sys
+    import glob
+
+    args = sys.argv[1:]
 
     # Default to Plan.md if no argument provided
-    if len(sys.argv) < 2:
-        input_file = Path(__file__).parent / "Plan.md"
+    if not args:
+        jobs = [(Path(__file__).parent / "Plan.md", None)]
+    elif len(args) == 2 and args[1].lower().endswith(".pdf"):
+        jobs = [(Path(args[0]), args[1])]
     else:
-        input_file = Path(sys.argv[1])
-
-    output_file = sys.argv[2] if len(sys.argv) > 2 else None
+        # Batch mode: every document shares one interpreter, font cache and compiled stylesheet
+        jobs = [(Path(p), None) for arg in args for p in (sorted(glob.glob(arg)) or [arg])]
 
-    print(f"Converting {input_file} to PDF...")
-    result = convert_md_to_pdf(str(input_file), output_file)
-    print(f"PDF generated: {result}")
+    for input_file, output_file in jobs:
+        print(f"Converting {input_file} to PDF...")
+        result = convert_md_to_pdf(str(input_file), output_file)
+        print(f"PDF generated: {result}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,35 @@
+"""
+nsfh_groups.py
+
+Cohort×sex group reductions shared by the wave replication scripts
+(replicate_nsfh_wave2.py, replicate_nsfh_wave3.py).
+
+Rows are mapped to integer group ids once; N and the means are then bincounts over
+those ids instead of a groupby per statistic.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+def encode_groups(d: pd.DataFrame, keys: list[str]) -> tuple[np.ndarray, pd.DataFrame]:
+    """Integer group id per row, numbered like groupby(keys, dropna=False, observed=True).
+
+    Groups are sorted by key (category order for Categoricals, missing keys last). Returns
+    the ids and a frame holding the key values of each group.
+    """
+    gid = np.zeros(len(d), dtype=np.int64)
+    for k in keys:
+        codes, uniques = pd.factorize(d[k], sort=True)
+        codes = np.where(codes < 0, len(uniques), codes)
+        gid = gid * (len(uniques) + 1) + codes
+    _, first, gid = np.unique(gid, return_index=True, return_inverse=True)
+    return gid, d[keys].iloc[first].reset_index(drop=True)
+
+def group_mean(vals: np.ndarray, gid: np.ndarray, ng: int) -> np.ndarray:
+    """Mean of the non-NaN vals in each group; NaN for groups without any."""
+    ok = ~np.isnan(vals)
+    cnts = np.bincount(gid[ok], minlength=ng)
+    sums = np.bincount(gid[ok], weights=vals[ok], minlength=ng)
+    return np.divide(sums, cnts, out=np.full(ng, np.nan), where=cnts > 0)
@@ -11,18 +11,52 @@
 # Designed for GitHub inclusion (no notebook state, deterministic outputs)
 # Style: FT-inspired with clean, journal-appropriate colors
 
+import argparse
+import functools
+import io
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
 import matplotlib as mpl
+mpl.use("Agg")  # figures only go to files; skip GUI backend discovery
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from matplotlib.lines import Line2D
 from pathlib import Path
 
+# Prefer the Rust-based calamine reader; fall back to openpyxl when it is not installed
+try:
+    import python_calamine  # noqa: F401
+    EXCEL_ENGINE = "calamine"
+except ImportError:
+    EXCEL_ENGINE = "openpyxl"
+
+# Polars (with fastexcel) projects the needed columns inside its Rust reader when available
+try:
+    import polars as pl
+    import fastexcel  # noqa: F401
+except ImportError:
+    pl = None
+
+# numexpr fuses the gap SE expression into one pass; plain numpy otherwise
+try:
+    import numexpr as ne
+except ImportError:
+    ne = None
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
 # =============================================================================
 # FT-STYLE CONFIGURATION (Journal-appropriate colors)
 # =============================================================================
 
 # Color palette - muted, professional, colorblind-friendly
-COLORS = {
+FT_COLORS = {
     'male': '#2A6185',       # Deep teal-blue
     'female': '#D4654A',     # Muted coral/terracotta
     'single': '#3D5A6C',     # Slate blue-gray for single-series plots
@@ -32,14 +66,39 @@ COLORS = {
     'spine': '#CCCCCC',      # Light gray for axis spines
 }
 
+# Matplotlib default cycle colors for the plain style
+PLAIN_COLORS = {
+    'male': 'C0',
+    'female': 'C1',
+    'single': 'C0',
+    'reference': 'gray',
+    'grid': '#B0B0B0',
+    'text': 'black',
+    'spine': 'black',
+}
+
+# Active palette (updated in place by setup_style)
+COLORS = dict(FT_COLORS)
+STYLE = "ft"  # set by setup_style
+
 # Figure styling
 FIG_WIDTH = 7
 FIG_HEIGHT = 4.5
-DPI = 300
+# PNG resolution; set NSFH_DPI=300 for print. Every figure is also written as vector PDF.
+DPI = int(os.environ.get("NSFH_DPI", "150"))
+
+FONT_PREFERENCE = ['Helvetica Neue', 'Helvetica', 'Arial', 'DejaVu Sans']
+
+@functools.lru_cache(maxsize=None)
+def _sans_serif_font():
+    """First installed font from FONT_PREFERENCE, resolved once so figures skip fallback lookups."""
+    from matplotlib import font_manager as fm
+    avail = {f.name for f in fm.fontManager.ttflist}
+    return next((name for name in FONT_PREFERENCE if name in avail), 'DejaVu Sans')
 
 def setup_ft_style():
     """Configure matplotlib for FT-inspired journal style."""
-    plt.rcParams.update({
+    mpl.rcParams.update({
         # Figure
         'figure.figsize': (FIG_WIDTH, FIG_HEIGHT),
         'figure.facecolor': 'white',
@@ -51,7 +110,7 @@ def setup_ft_style():
 
         # Font - clean sans-serif
         'font.family': 'sans-serif',
-        'font.sans-serif': ['Helvetica Neue', 'Helvetica', 'Arial', 'DejaVu Sans'],
+        'font.sans-serif': [_sans_serif_font()],
         'font.size': 10,
 
         # Axes
@@ -94,140 +153,357 @@ def setup_ft_style():
         'lines.markersize': 6,
     })
 
+def setup_style(name="ft"):
+    """Apply the 'ft' journal style or plain matplotlib defaults, with the matching palette."""
+    global STYLE
+    if name == "ft":
+        COLORS.update(FT_COLORS)
+        setup_ft_style()
+    elif name == "plain":
+        COLORS.update(PLAIN_COLORS)
+        mpl.rcdefaults()
+    else:
+        raise ValueError(f"Unknown style: {name}")
+    STYLE = name
+
 # Apply style on import
-setup_ft_style()
+setup_style("ft")
 
 SCRIPT_DIR = Path(__file__).parent.resolve()
 PROJECT_ROOT = SCRIPT_DIR.parent
 TABLES_XLSX = PROJECT_ROOT / "Data" / "NSFH_WavesStacked" / "NSFH_stacked_tables.xlsx"
+# Written next to the workbook by replicate_nsfh_stacked.py
+TABLES_PARQUET = TABLES_XLSX.with_name("NSFH_stacked_primary_all_by_wave.parquet")
 ANALYTIC_XLSX = PROJECT_ROOT / "Data" / "NSFH_WavesStacked" / "NSFH_stacked_analytic_replication_ready.xlsx"
 OUTDIR = PROJECT_ROOT / "figures"
 OUTDIR.mkdir(exist_ok=True)
+# Render settings each figure was last written with (figure name -> settings)
+SETTINGS_STAMP = OUTDIR / ".render_settings.json"
+
+# Only the columns the plots touch are parsed from the sheet
+TABLE_COLUMNS = [
+    "wave", "sex_label", "cohort_primary", "p_ever_partnered", "N_age_le_35",
+    "mean_marriages_if_partnered", "p_remarried_2plus_if_partnered",
+]
+
+def cohort_order(series):
+    """Chronological order of the distinct cohort labels (≤ first, ≥ last)."""
+    u = pd.Series(series.dropna().unique()).astype(str)
+    nums = u.str.extract(r"(\d+)")[0].astype(float).to_numpy()
+    key = np.where(u.str.startswith("≤"), -10000,
+                   np.where(u.str.startswith("≥"), np.nan_to_num(nums, nan=10000), np.nan_to_num(nums)))
+    return u.iloc[np.argsort(key, kind="stable")].tolist()
+
+def _tables_source():
+    """The Parquet copy of the by-wave sheet when it is at least as new as the workbook."""
+    if TABLES_PARQUET.exists() and (
+        not TABLES_XLSX.exists() or TABLES_PARQUET.stat().st_mtime >= TABLES_XLSX.stat().st_mtime
+    ):
+        return TABLES_PARQUET
+    return TABLES_XLSX
+
+@functools.lru_cache(maxsize=None)
+def _load_tables():
+    """Read the by-wave table sheet once; callers must copy before mutating."""
+    if _tables_source() == TABLES_PARQUET:
+        df = pd.read_parquet(TABLES_PARQUET, columns=TABLE_COLUMNS).astype(
+            {"sex_label": "category", "cohort_primary": "category"}
+        )
+    elif pl is not None:
+        frame = pl.read_excel(TABLES_XLSX, sheet_name="stacked_primary_all_by_wave",
+                              engine="calamine", columns=TABLE_COLUMNS)
+        # to_dict avoids requiring pyarrow for the hand-off to pandas
+        df = pd.DataFrame(frame.to_dict(as_series=False)).astype(
+            {"sex_label": "category", "cohort_primary": "category"}
+        )
+    else:
+        df = pd.read_excel(
+            TABLES_XLSX,
+            sheet_name="stacked_primary_all_by_wave",
+            engine=EXCEL_ENGINE,
+            usecols=TABLE_COLUMNS,
+            dtype={"sex_label": "category", "cohort_primary": "category"},
+        )
+    # Order cohorts chronologically once so every plot can sort on the categorical
+    df["cohort_primary"] = df["cohort_primary"].cat.set_categories(
+        cohort_order(df["cohort_primary"]), ordered=True
+    )
+    # float32 is ample precision for proportions/means at these sample sizes
+    for c in ["p_ever_partnered", "p_remarried_2plus_if_partnered", "mean_marriages_if_partnered"]:
+        df[c] = df[c].astype("float32")
+    return df
+
+def _ci(p, n):
+    se = np.sqrt(p * (1 - p) / n)
+    return p - 1.96 * se, p + 1.96 * se
 
-def cohort_sort_key(s):
-    s = str(s)
-    if s.startswith("≤"):
-        return -10000
-    if s.startswith("≥"):
-        nums = "".join([c for c in s if c.isdigit()])
-        return int(nums) if nums else 10000
-    nums = "".join([c if c.isdigit() else " " for c in s]).split()
-    return int(nums[0]) if nums else 0
+# The JIT only pays for its compile on large inputs (e.g. bootstrap replicates);
+# the cohort tables themselves are a handful of cells and stay on NumPy.
+_ci_jit = njit(cache=True)(_ci) if njit is not None else None
+JIT_MIN_SIZE = 100_000
 
 def add_ci(p, n):
-    se = np.sqrt(p * (1 - p) / n)
-    return p - 1.96 * se, p + 1.96 * se
+    p, n = np.asarray(p), np.asarray(n)
+    if _ci_jit is not None and p.size >= JIT_MIN_SIZE:
+        return _ci_jit(p, n)
+    return _ci(p, n)
+
+SEXES = ["Male", "Female"]
+
+# Figures are reused across waves within a process, one per plot kind. Static
+# decorations are drawn once; each wave only updates the data-bearing artists.
+_CANVASES = {}
+
+def _canvas(kind):
+    if kind not in _CANVASES:
+        # Bare Figure on an Agg canvas: no pyplot figure manager to register with
+        fig = Figure(layout="constrained")
+        FigureCanvasAgg(fig)
+        ax = fig.subplots()
+        setup, _ = DRAWERS[kind]
+        artists = setup(ax)
+        artists["errorbars"] = []
+        _CANVASES[kind] = (fig, ax, artists)
+    return _CANVASES[kind]
+
+def _close_figure(kind):
+    # Not registered with pyplot, so dropping the reference is enough
+    _CANVASES.pop(kind, None)
+
+def _set_cohort_ticks(ax, cohorts):
+    """Label integer x positions with the wave's cohorts; returns label -> position."""
+    ax.set_xticks(range(len(cohorts)), cohorts, rotation=45, ha="right")
+    return {c: i for i, c in enumerate(cohorts)}
+
+def _sex_lines(ax):
+    return {sex: ax.plot([], [], marker="o", label=sex, color=COLORS[sex.lower()])[0]
+            for sex in SEXES}
+
+# -----------------------------------------------------------------------------
+# Per-wave drawing (each takes the wave's slice only, so waves can run in parallel)
+# -----------------------------------------------------------------------------
+
+def _setup_ever_partnered(ax):
+    lines = _sex_lines(ax)
+    ax.set_ylabel("Probability")
+    ax.set_xlabel("Birth cohort")
+    ax.set_ylim(0, 1)
+    ax.legend()
+    return {"lines": lines}
+
+def _draw_ever_partnered(ax, artists, wave, d):
+    x = np.arange(len(d))
+    _set_cohort_ticks(ax, list(d.index))
+    for sex, line in artists["lines"].items():
+        p = d[("p_ever_partnered", sex)].to_numpy()
+        lo = d[("lo", sex)].to_numpy()
+        hi = d[("hi", sex)].to_numpy()
+
+        line.set_data(x, p)
+        artists["errorbars"].append(
+            ax.errorbar(x, p, yerr=[p-lo, hi-p],
+                        fmt="none", capsize=3, color=line.get_color(), alpha=0.7))
+
+    ax.set_title(f"Ever partnered by age ≤35 — {wave}")
+
+def _setup_gap(ax):
+    line, = ax.plot([], [], marker="o", color=COLORS['single'])
+    # Added as a plain artist so relim() skips it: an axhline is round-tripped through the
+    # previous wave's transform and leaves ~1e-16 residue in the data limits. y=0 is kept
+    # in view through "include_y" instead.
+    ax.add_artist(Line2D([0, 1], [0, 0], transform=ax.get_yaxis_transform(),
+                         linewidth=1, color=COLORS['reference'], linestyle='--'))
+    ax.set_ylabel("Gap")
+    ax.set_xlabel("Birth cohort")
+    return {"line": line, "include_y": [0]}
+
+def _draw_gap(ax, artists, wave, d):
+    d = d.sort_values("cohort_primary")
+    x = np.arange(len(d))
+    _set_cohort_ticks(ax, d["cohort_primary"].astype(str).tolist())
+    gap = d["gap"].to_numpy()
+
+    artists["line"].set_data(x, gap)
+    artists["errorbars"].append(
+        ax.errorbar(x, gap, yerr=[gap-d["lo"].to_numpy(), d["hi"].to_numpy()-gap],
+                    fmt="none", capsize=3, color=COLORS['single'], alpha=0.7))
+    ax.set_title(f"Female − Male gap in ever partnered — {wave}")
+
+def _setup_mean_marriages(ax):
+    lines = _sex_lines(ax)
+    ax.set_ylabel("Mean marriages")
+    ax.set_xlabel("Birth cohort")
+    ax.legend()
+    return {"lines": lines}
+
+def _setup_remarriage(ax):
+    lines = _sex_lines(ax)
+    ax.set_ylabel("Probability")
+    ax.set_xlabel("Birth cohort")
+    ax.set_ylim(0, 1)
+    ax.legend()
+    return {"lines": lines}
+
+def _update_sex_lines(ax, artists, by_sex, col):
+    # Cohorts present for either sex, in the categorical's chronological order
+    present = set().union(*(s["cohort_primary"] for s in by_sex.values()))
+    cats = next(iter(by_sex.values()))["cohort_primary"].cat.categories
+    pos = _set_cohort_ticks(ax, [c for c in cats if c in present])
+    for sex, line in artists["lines"].items():
+        s = by_sex.get(sex)
+        if s is None:
+            line.set_data([], [])
+        else:
+            line.set_data(s["cohort_primary"].map(pos).to_numpy(), s[col].to_numpy())
+
+def _draw_mean_marriages(ax, artists, wave, by_sex):
+    _update_sex_lines(ax, artists, by_sex, "mean_marriages_if_partnered")
+    ax.set_title(f"Mean marriages | ever partnered — {wave}")
+
+def _draw_remarriage(ax, artists, wave, by_sex):
+    _update_sex_lines(ax, artists, by_sex, "p_remarried_2plus_if_partnered")
+    ax.set_title(f"P(remarried 2+ | partnered) — {wave}")
+
+# Plot kind -> (setup, per-wave update); the kind doubles as the output file prefix
+DRAWERS = {
+    "ever_partnered": (_setup_ever_partnered, _draw_ever_partnered),
+    "gap_ever_partnered": (_setup_gap, _draw_gap),
+    "mean_marriages": (_setup_mean_marriages, _draw_mean_marriages),
+    "p_remarried2plus": (_setup_remarriage, _draw_remarriage),
+}
 
-def plot_ever_partnered_by_wave():
-    df = pd.read_excel(TABLES_XLSX, sheet_name="stacked_primary_all_by_wave")
-
-    for wave, d in df.groupby("wave"):
-        cohorts = sorted(d["cohort_primary"].dropna().unique(), key=cohort_sort_key)
-        d["cohort_primary"] = pd.Categorical(d["cohort_primary"], categories=cohorts, ordered=True)
-
-        fig, ax = plt.subplots()
-        sex_colors = {'Male': COLORS['male'], 'Female': COLORS['female']}
-
-        for sex in ["Male", "Female"]:
-            s = d[d["sex_label"] == sex].sort_values("cohort_primary")
-            p = s["p_ever_partnered"]
-            n = s["N_age_le_35"]
-            lo, hi = add_ci(p, n)
-            color = sex_colors[sex]
-
-            ax.plot(s["cohort_primary"], p, marker="o", label=sex, color=color)
-            ax.errorbar(s["cohort_primary"], p, yerr=[p-lo, hi-p],
-                        fmt="none", capsize=3, color=color, alpha=0.7)
-
-        ax.set_title(f"Ever partnered by age ≤35 — {wave}")
-        ax.set_ylabel("Probability")
-        ax.set_xlabel("Birth cohort")
-        ax.set_ylim(0, 1)
-        plt.xticks(rotation=45, ha="right")
-        ax.legend()
-        plt.tight_layout()
-        plt.savefig(OUTDIR / f"ever_partnered_{wave}.png")
-        plt.close()
-
-def plot_gap_by_wave():
-    df = pd.read_excel(TABLES_XLSX, sheet_name="stacked_primary_all_by_wave")
-
-    out = []
-    for wave, d in df.groupby("wave"):
-        f = d[d["sex_label"]=="Female"][["cohort_primary","p_ever_partnered","N_age_le_35"]]
-        m = d[d["sex_label"]=="Male"][["cohort_primary","p_ever_partnered","N_age_le_35"]]
-        g = f.merge(m, on="cohort_primary", suffixes=("_F","_M"))
-        g["gap"] = g["p_ever_partnered_F"] - g["p_ever_partnered_M"]
-        g["se"] = np.sqrt(
-            g["p_ever_partnered_F"]*(1-g["p_ever_partnered_F"])/g["N_age_le_35_F"] +
-            g["p_ever_partnered_M"]*(1-g["p_ever_partnered_M"])/g["N_age_le_35_M"]
-        )
-        g["lo"] = g["gap"] - 1.96*g["se"]
-        g["hi"] = g["gap"] + 1.96*g["se"]
-        g["wave"] = wave
-        out.append(g)
-
-    gdf = pd.concat(out, ignore_index=True)
-
-    for wave, d in gdf.groupby("wave"):
-        cohorts = sorted(d["cohort_primary"].dropna().unique(), key=cohort_sort_key)
-        d["cohort_primary"] = pd.Categorical(d["cohort_primary"], categories=cohorts, ordered=True)
-        d = d.sort_values("cohort_primary")
-
-        fig, ax = plt.subplots()
-        ax.plot(d["cohort_primary"], d["gap"], marker="o", color=COLORS['single'])
-        ax.errorbar(d["cohort_primary"], d["gap"],
-                    yerr=[d["gap"]-d["lo"], d["hi"]-d["gap"]],
-                    fmt="none", capsize=3, color=COLORS['single'], alpha=0.7)
-        ax.axhline(0, linewidth=1, color=COLORS['reference'], linestyle='--')
-        ax.set_title(f"Female − Male gap in ever partnered — {wave}")
-        ax.set_ylabel("Gap")
-        ax.set_xlabel("Birth cohort")
-        plt.xticks(rotation=45, ha="right")
-        plt.tight_layout()
-        plt.savefig(OUTDIR / f"gap_ever_partnered_{wave}.png")
-        plt.close()
-
-def plot_marriages_and_remarriage():
-    df = pd.read_excel(TABLES_XLSX, sheet_name="stacked_primary_all_by_wave")
-    sex_colors = {'Male': COLORS['male'], 'Female': COLORS['female']}
-
-    for wave, d in df.groupby("wave"):
-        cohorts = sorted(d["cohort_primary"].dropna().unique(), key=cohort_sort_key)
-        d["cohort_primary"] = pd.Categorical(d["cohort_primary"], categories=cohorts, ordered=True)
-
-        # Mean marriages
-        fig, ax = plt.subplots()
-        for sex in ["Male", "Female"]:
-            s = d[d["sex_label"]==sex].sort_values("cohort_primary")
-            ax.plot(s["cohort_primary"], s["mean_marriages_if_partnered"],
-                    marker="o", label=sex, color=sex_colors[sex])
-        ax.set_title(f"Mean marriages | ever partnered — {wave}")
-        ax.set_ylabel("Mean marriages")
-        ax.set_xlabel("Birth cohort")
-        plt.xticks(rotation=45, ha="right")
-        ax.legend()
-        plt.tight_layout()
-        plt.savefig(OUTDIR / f"mean_marriages_{wave}.png")
-        plt.close()
-
-        # Remarriage probability
-        fig, ax = plt.subplots()
-        for sex in ["Male", "Female"]:
-            s = d[d["sex_label"]==sex].sort_values("cohort_primary")
-            ax.plot(s["cohort_primary"], s["p_remarried_2plus_if_partnered"],
-                    marker="o", label=sex, color=sex_colors[sex])
-        ax.set_title(f"P(remarried 2+ | partnered) — {wave}")
-        ax.set_ylabel("Probability")
-        ax.set_xlabel("Birth cohort")
-        ax.set_ylim(0, 1)
-        plt.xticks(rotation=45, ha="right")
-        ax.legend()
-        plt.tight_layout()
-        plt.savefig(OUTDIR / f"p_remarried2plus_{wave}.png")
-        plt.close()
+def _save(fig, path, **kwargs):
+    """Render into memory, then write the file with a single call."""
+    buf = io.BytesIO()
+    fig.savefig(buf, format=path.suffix.lstrip("."), **kwargs)
+    path.write_bytes(buf.getvalue())
+
+def _draw_one_wave(kind, wave, sub_df, outpath):
+    fig, ax, artists = _canvas(kind)
+    # Error bar containers have no set_data, so the previous wave's are swapped out
+    for eb in artists["errorbars"]:
+        eb.remove()
+    artists["errorbars"].clear()
+
+    _, draw = DRAWERS[kind]
+    draw(ax, artists, wave, sub_df)
+    ax.relim()
+    for y in artists.get("include_y", []):
+        ax.update_datalim([(0, y)])
+    ax.autoscale_view()
+    _save(fig, outpath, dpi=DPI)
+    _save(fig, outpath.with_suffix(".pdf"))
+
+# -----------------------------------------------------------------------------
+# Task builders: (kind, wave, slice, output path) per figure
+# -----------------------------------------------------------------------------
+
+def ever_partnered_tasks(df):
+    df = df.copy()
+
+    # CI bounds and the sex-wide layout are computed once for every wave
+    df["lo"], df["hi"] = add_ci(df["p_ever_partnered"], df["N_age_le_35"])
+    pv = df.pivot_table(index=["wave", "cohort_primary"], columns="sex_label",
+                        values=["p_ever_partnered", "lo", "hi"], observed=True)
+
+    return [("ever_partnered", wave, d.droplevel("wave"), OUTDIR / f"ever_partnered_{wave}.png")
+            for wave, d in pv.groupby(level="wave")]
+
+def gap_tasks(df):
+    # One pivot and one vectorized pass over every wave instead of a merge per wave
+    wide = df.pivot_table(index=["wave", "cohort_primary"], columns="sex_label",
+                          values=["p_ever_partnered", "N_age_le_35"], observed=True)
+    pF = wide[("p_ever_partnered", "Female")].to_numpy()
+    pM = wide[("p_ever_partnered", "Male")].to_numpy()
+    nF = wide[("N_age_le_35", "Female")].to_numpy()
+    nM = wide[("N_age_le_35", "Male")].to_numpy()
+    if ne is not None:
+        se = ne.evaluate("sqrt(pF*(1-pF)/nF + pM*(1-pM)/nM)")
+    else:
+        se = np.sqrt(pF*(1-pF)/nF + pM*(1-pM)/nM)
+
+    gdf = pd.DataFrame({"gap": pF - pM, "se": se}, index=wide.index).dropna()  # cohorts observed for only one sex have no gap
+    gdf["lo"] = gdf["gap"] - 1.96*gdf["se"]
+    gdf["hi"] = gdf["gap"] + 1.96*gdf["se"]
+    gdf = gdf.reset_index()
+
+    return [("gap_ever_partnered", wave, d, OUTDIR / f"gap_ever_partnered_{wave}.png")
+            for wave, d in gdf.groupby("wave")]
+
+def marriages_tasks(df):
+    # Sort once; each (wave, sex) series is then a hash lookup rather than a mask + sort
+    df = df.sort_values(["wave", "sex_label", "cohort_primary"])
+    gb = df.groupby(["wave", "sex_label"], sort=False, observed=True)
+
+    tasks = []
+    for wave in df["wave"].unique():
+        by_sex = {sex: gb.get_group((wave, sex)) for sex in ["Male", "Female"] if (wave, sex) in gb.groups}
+        tasks.append(("mean_marriages", wave, by_sex, OUTDIR / f"mean_marriages_{wave}.png"))
+        tasks.append(("p_remarried2plus", wave, by_sex, OUTDIR / f"p_remarried2plus_{wave}.png"))
+    return tasks
+
+def _stale(out: Path, deps: list[Path]) -> bool:
+    return not out.exists() or any(d.stat().st_mtime > out.stat().st_mtime for d in deps)
+
+def _render_settings():
+    return f"style={STYLE} dpi={DPI}"
+
+def _read_stamp():
+    try:
+        return json.loads(SETTINGS_STAMP.read_text())
+    except (FileNotFoundError, ValueError):
+        return {}
+
+def _record_settings(tasks):
+    stamp = _read_stamp()
+    stamp.update({task[3].name: _render_settings() for task in tasks})
+    SETTINGS_STAMP.write_text(json.dumps(stamp, indent=1, sort_keys=True))
+
+def _pending(tasks, force=False):
+    """Drop tasks whose figure is newer than both the tables source and this script and was
+    rendered with the current settings."""
+    if force:
+        return tasks
+    deps = [_tables_source(), Path(__file__)]
+    stamp, settings = _read_stamp(), _render_settings()
+    return [task for task in tasks
+            if stamp.get(task[3].name) != settings
+            or _stale(task[3], deps) or _stale(task[3].with_suffix(".pdf"), deps)]
+
+def _run_serial(tasks):
+    for task in tasks:
+        _draw_one_wave(*task)
+    for kind in {task[0] for task in tasks}:
+        _close_figure(kind)
+    _record_settings(tasks)
+
+def plot_ever_partnered_by_wave(df=None, force=False):
+    _run_serial(_pending(ever_partnered_tasks(_load_tables() if df is None else df), force))
+
+def plot_gap_by_wave(df=None, force=False):
+    _run_serial(_pending(gap_tasks(_load_tables() if df is None else df), force))
+
+def plot_marriages_and_remarriage(df=None, force=False):
+    _run_serial(_pending(marriages_tasks(_load_tables() if df is None else df), force))
+
+def plot_all_parallel(df, max_workers=None, force=False, style="ft"):
+    """Render every out-of-date figure, one wave slice per task, across worker processes."""
+    tasks = _pending(ever_partnered_tasks(df) + gap_tasks(df) + marriages_tasks(df), force)
+    if not tasks:
+        print("All figures up to date (use --force to regenerate)")
+        return
+    workers = min(max_workers or os.cpu_count() or 1, len(tasks))
+    with ProcessPoolExecutor(max_workers=workers, initializer=setup_style, initargs=(style,)) as ex:
+        # list() surfaces any exception raised in a worker
+        list(ex.map(_draw_one_wave, *zip(*tasks)))
+    _record_settings(tasks)
 
 if __name__ == "__main__":
-    plot_ever_partnered_by_wave()
-    plot_gap_by_wave()
-    plot_marriages_and_remarriage()
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--force", action="store_true", help="Regenerate figures even if they are up to date.")
+    ap.add_argument("--style", choices=["plain", "ft"], default="ft", help="Figure style (default: ft); figures drawn in another style are re-rendered.")
+    args = ap.parse_args()
+
+    setup_style(args.style)
+    df = _load_tables()
+    plot_all_parallel(df, force=args.force, style=args.style)
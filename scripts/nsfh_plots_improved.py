@@ -4,13 +4,23 @@
 
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
+import matplotlib as mpl
+mpl.use("Agg")  # figures only go to files; skip GUI backend discovery
 import matplotlib.ticker as mtick
+from matplotlib import style
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
 from pathlib import Path
 
 TABLES_XLSX = Path("NSFH_stacked_tables.xlsx")
+# Columnar snapshot of the by-wave sheet, refreshed whenever the workbook is newer
+TABLES_PARQUET = Path("NSFH_stacked_primary_all_by_wave.parquet")
 OUTDIR = Path("figures_improved")
 OUTDIR.mkdir(exist_ok=True)
+# Per-sex metrics drawn by the cohort plots
+PLOT_VALUES = ["p_ever_partnered", "N_age_le_35", "mean_marriages_if_partnered", "p_remarried_2plus_if_partnered"]
+# Only these columns of the by-wave sheet are read
+TABLE_COLUMNS = ["wave", "sex_label", "cohort_primary"] + PLOT_VALUES
 
 # ─────────────────────────────────────────────────────────────────────────────
 # Style configuration
@@ -24,30 +34,9 @@ COLORS = {
     "ci_alpha": 0.20,       # CI band transparency
 }
 
-# Typography and layout
-plt.rcParams.update({
-    "font.family": "sans-serif",
-    "font.sans-serif": ["DejaVu Sans", "Helvetica", "Arial"],
-    "font.size": 11,
-    "axes.titlesize": 13,
-    "axes.titleweight": "bold",
-    "axes.labelsize": 11,
-    "axes.labelweight": "medium",
-    "axes.spines.top": False,
-    "axes.spines.right": False,
-    "axes.linewidth": 0.8,
-    "xtick.labelsize": 10,
-    "ytick.labelsize": 10,
-    "legend.fontsize": 10,
-    "legend.frameon": False,
-    "figure.facecolor": "white",
-    "axes.facecolor": "white",
-    "axes.grid": True,
-    "grid.alpha": 0.3,
-    "grid.linewidth": 0.5,
-    "lines.linewidth": 2.0,
-    "lines.markersize": 7,
-})
+# Typography and layout live in nsfh.mplstyle next to this script
+STYLE_FILE = Path(__file__).with_name("nsfh.mplstyle")
+style.use(STYLE_FILE)
 
 
 def cohort_sort_key(s):
@@ -62,6 +51,29 @@ def cohort_sort_key(s):
     return int(nums[0]) if nums else 0
 
 
+# Parsed sort key per cohort label, filled on first sight so each label is parsed once
+_COHORT_ORDER = {}
+
+
+def sort_cohorts(labels):
+    """Cohort labels in chronological order."""
+    for c in labels:
+        if c not in _COHORT_ORDER:
+            _COHORT_ORDER[c] = cohort_sort_key(c)
+    return sorted(labels, key=_COHORT_ORDER.__getitem__)
+
+
+def ordered_cohorts(cohort):
+    """Distinct cohort labels of a column, in chronological order.
+
+    replicate_nsfh_stacked.py writes cohort_primary as an ordered categorical already in
+    that order, so Parquet reads use it directly; workbook reads fall back to sorting.
+    """
+    if isinstance(cohort.dtype, pd.CategoricalDtype) and cohort.cat.ordered:
+        return cohort.cat.remove_unused_categories().cat.categories.tolist()
+    return sort_cohorts(cohort.dropna().unique())
+
+
 def add_ci(p, n):
     """Calculate 95% CI for proportion."""
     p = np.asarray(p)
@@ -78,6 +90,113 @@ def format_cohort_label(s):
     return s
 
 
+def read_by_wave_table():
+    """The stacked_primary_all_by_wave sheet, via the Parquet snapshot when it is current."""
+    if TABLES_PARQUET.exists() and (
+        not TABLES_XLSX.exists() or TABLES_PARQUET.stat().st_mtime >= TABLES_XLSX.stat().st_mtime
+    ):
+        df = pd.read_parquet(TABLES_PARQUET, columns=TABLE_COLUMNS)
+    else:
+        df = pd.read_excel(TABLES_XLSX, sheet_name="stacked_primary_all_by_wave", engine="openpyxl",
+                           usecols=TABLE_COLUMNS)
+        try:
+            df.to_parquet(TABLES_PARQUET, index=False)
+        except ImportError:
+            pass  # no parquet engine (pyarrow/fastparquet) installed; keep reading the workbook
+    # replicate_nsfh_stacked.py stores the means as nullable Float64; the plots need plain
+    # float64 (NaN, not pd.NA), or multi-column pivots come back as object arrays
+    return df.astype({c: "float64" for c in PLOT_VALUES})
+
+
+def load_wave2_tables(min_n=50):
+    """Wave 2 rows of the by-wave table with at least *min_n* respondents per cell.
+
+    Read once in __main__ and shared by every plotting function.
+    """
+    df = read_by_wave_table()
+    # Focus on wave2 (wave3 has insufficient data) and drop small samples
+    df = df[df["wave"] == "wave2"]
+    return df[df["N_age_le_35"] >= min_n].copy()
+
+
+def new_figure(**kwargs):
+    """A Figure on an Agg canvas, bypassing pyplot's figure manager."""
+    fig = Figure(**kwargs)
+    FigureCanvasAgg(fig)
+    return fig
+
+
+def reuse_figure(fig, figsize):
+    """Clear *fig* and resize it for the next plot, or create one if *fig* is None."""
+    if fig is None:
+        return new_figure(figsize=figsize)
+    fig.clear()
+    fig.set_size_inches(figsize)
+    return fig
+
+
+def save_figure(fig, name, dpi=300):
+    """Write OUTDIR/<name>.png and .pdf, measuring the tight bounding box once for both."""
+    fig.set_layout_engine(None)
+    screen_dpi = fig.dpi
+    fig.set_dpi(dpi)
+    fig.draw_without_rendering()
+    bbox = fig.get_tightbbox().padded(mpl.rcParams["savefig.pad_inches"])
+    fig.set_dpi(screen_dpi)
+    fig.savefig(OUTDIR / f"{name}.png", dpi=dpi, bbox_inches=bbox)
+    fig.savefig(OUTDIR / f"{name}.pdf", bbox_inches=bbox)
+    print(f"Saved: {name}")
+
+
+def pivot_by_sex(df):
+    """Chronological cohorts and a cohort × (metric, sex) table of the plotted metrics.
+
+    Built once per figure so the per-sex loops just pick columns instead of
+    re-filtering and re-sorting the frame for every panel.
+    """
+    cohorts = ordered_cohorts(df["cohort_primary"])
+    wide = df.pivot_table(
+        index="cohort_primary", columns="sex_label", values=PLOT_VALUES, observed=True, dropna=False
+    )
+    return cohorts, wide.reindex(cohorts)
+
+
+def compute_ci(df):
+    """Ever-partnered proportion with its 95% CI, by cohort (chronological rows) and sex.
+
+    Columns are (stat, sex) pairs with stat in p/lo/hi.
+    """
+    if df.empty:
+        return pd.DataFrame()
+    _, wide = pivot_by_sex(df)
+    p = wide["p_ever_partnered"]
+    lo, hi = add_ci(p, wide["N_age_le_35"])
+    return pd.concat({
+        "p": p,
+        "lo": pd.DataFrame(lo, index=p.index, columns=p.columns),
+        "hi": pd.DataFrame(hi, index=p.index, columns=p.columns),
+    }, axis=1)
+
+
+def compute_gap(df):
+    """Female − Male ever-partnered gap with its 95% CI, indexed by cohort in chronological order.
+
+    Only cohorts with rows for both sexes are kept (df is already limited to cells with N >= 50).
+    """
+    f = df[df["sex_label"] == "Female"][["cohort_primary", "p_ever_partnered", "N_age_le_35"]]
+    m = df[df["sex_label"] == "Male"][["cohort_primary", "p_ever_partnered", "N_age_le_35"]]
+    g = f.merge(m, on="cohort_primary", suffixes=("_F", "_M"))
+
+    # Plain ndarrays: no index alignment or intermediate Series for the arithmetic
+    p_f, n_f = g["p_ever_partnered_F"].to_numpy(), g["N_age_le_35_F"].to_numpy()
+    p_m, n_m = g["p_ever_partnered_M"].to_numpy(), g["N_age_le_35_M"].to_numpy()
+    gap = p_f - p_m
+    se = np.sqrt(p_f * (1 - p_f) / n_f + p_m * (1 - p_m) / n_m)
+    out = pd.DataFrame({"gap": gap, "lo": gap - 1.96 * se, "hi": gap + 1.96 * se},
+                       index=pd.Index(g["cohort_primary"]))
+    return out.reindex(ordered_cohorts(g["cohort_primary"]))
+
+
 def annotate_sample_sizes(ax, x_positions, n_values, y_offset=-0.08, fontsize=8):
     """Add sample size annotations below x-axis."""
     for x, n in zip(x_positions, n_values):
@@ -89,40 +208,31 @@ def annotate_sample_sizes(ax, x_positions, n_values, y_offset=-0.08, fontsize=8)
 # Plotting functions
 # ─────────────────────────────────────────────────────────────────────────────
 
-def plot_ever_partnered():
+def plot_ever_partnered(df, fig=None, ci=None):
     """Ever partnered by age ≤35, by sex and cohort (wave2 only - sufficient data)."""
-    df = pd.read_excel(TABLES_XLSX, sheet_name="stacked_primary_all_by_wave")
-    
-    # Focus on wave2 (wave3 has insufficient data)
-    df = df[df["wave"] == "wave2"].copy()
-    
-    # Filter out small samples
-    df = df[df["N_age_le_35"] >= 50]
-    
     if df.empty:
         print("No sufficient data for ever_partnered plot")
         return
     
-    cohorts = sorted(df["cohort_primary"].dropna().unique(), key=cohort_sort_key)
+    if ci is None:
+        ci = compute_ci(df)
+    cohorts = list(ci.index)
     cohort_labels = [format_cohort_label(c) for c in cohorts]
     x = np.arange(len(cohorts))
     
-    fig, ax = plt.subplots(figsize=(8, 5.5))
+    fig = reuse_figure(fig, figsize=(8, 5.5))
+    ax = fig.subplots()
     
     for sex in ["Male", "Female"]:
-        s = df[df["sex_label"] == sex].copy()
-        s["cohort_primary"] = pd.Categorical(s["cohort_primary"], categories=cohorts, ordered=True)
-        s = s.sort_values("cohort_primary").reset_index(drop=True)
-        
-        p = s["p_ever_partnered"].values
-        n = s["N_age_le_35"].values
-        lo, hi = add_ci(p, n)
+        p = ci[("p", sex)].to_numpy()
+        lo = ci[("lo", sex)].to_numpy()
+        hi = ci[("hi", sex)].to_numpy()
         
         # Plot CI band
-        ax.fill_between(x[:len(p)], lo, hi, alpha=COLORS["ci_alpha"], 
+        ax.fill_between(x, lo, hi, alpha=COLORS["ci_alpha"], 
                         color=COLORS[sex], linewidth=0)
         # Plot line and markers
-        ax.plot(x[:len(p)], p, marker="o", color=COLORS[sex], label=sex,
+        ax.plot(x, p, marker="o", color=COLORS[sex], label=sex,
                 markerfacecolor="white", markeredgewidth=2)
     
     ax.set_xticks(x)
@@ -139,46 +249,24 @@ def plot_ever_partnered():
     ax.text(0.02, 0.02, "Note: Cohorts with n < 50 excluded",
             transform=ax.transAxes, fontsize=8, color="#666666", style="italic")
     
-    plt.tight_layout()
-    plt.savefig(OUTDIR / "ever_partnered_by_cohort.png", dpi=300, bbox_inches="tight")
-    plt.savefig(OUTDIR / "ever_partnered_by_cohort.pdf", bbox_inches="tight")
-    plt.close()
-    print("Saved: ever_partnered_by_cohort")
+    fig.tight_layout()
+    save_figure(fig, "ever_partnered_by_cohort")
 
 
-def plot_partnership_gap():
+def plot_partnership_gap(df, fig=None, gap=None):
     """Female − Male gap in ever partnered (wave2)."""
-    df = pd.read_excel(TABLES_XLSX, sheet_name="stacked_primary_all_by_wave")
-    df = df[df["wave"] == "wave2"].copy()
-    
-    # Build gap dataframe
-    f = df[df["sex_label"] == "Female"][["cohort_primary", "p_ever_partnered", "N_age_le_35"]].copy()
-    m = df[df["sex_label"] == "Male"][["cohort_primary", "p_ever_partnered", "N_age_le_35"]].copy()
-    g = f.merge(m, on="cohort_primary", suffixes=("_F", "_M"))
-    
-    # Filter small samples
-    g = g[(g["N_age_le_35_F"] >= 50) & (g["N_age_le_35_M"] >= 50)]
+    g = compute_gap(df) if gap is None else gap
     
     if g.empty:
         print("No sufficient data for gap plot")
         return
     
-    g["gap"] = g["p_ever_partnered_F"] - g["p_ever_partnered_M"]
-    g["se"] = np.sqrt(
-        g["p_ever_partnered_F"] * (1 - g["p_ever_partnered_F"]) / g["N_age_le_35_F"] +
-        g["p_ever_partnered_M"] * (1 - g["p_ever_partnered_M"]) / g["N_age_le_35_M"]
-    )
-    g["lo"] = g["gap"] - 1.96 * g["se"]
-    g["hi"] = g["gap"] + 1.96 * g["se"]
-    
-    cohorts = sorted(g["cohort_primary"].unique(), key=cohort_sort_key)
-    cohort_labels = [format_cohort_label(c) for c in cohorts]
-    g["cohort_primary"] = pd.Categorical(g["cohort_primary"], categories=cohorts, ordered=True)
-    g = g.sort_values("cohort_primary").reset_index(drop=True)
+    cohort_labels = [format_cohort_label(c) for c in g.index]
     
     x = np.arange(len(g))
     
-    fig, ax = plt.subplots(figsize=(8, 5.5))
+    fig = reuse_figure(fig, figsize=(8, 5.5))
+    ax = fig.subplots()
     
     # CI band
     ax.fill_between(x, g["lo"], g["hi"], alpha=COLORS["ci_alpha"], 
@@ -203,38 +291,28 @@ def plot_partnership_gap():
     
     ax.set_title("Sex Gap in Partnership by Age 35\nNSFH Wave 2 (1992–1994)")
     
-    plt.tight_layout()
-    plt.savefig(OUTDIR / "partnership_gap_by_cohort.png", dpi=300, bbox_inches="tight")
-    plt.savefig(OUTDIR / "partnership_gap_by_cohort.pdf", bbox_inches="tight")
-    plt.close()
-    print("Saved: partnership_gap_by_cohort")
+    fig.tight_layout()
+    save_figure(fig, "partnership_gap_by_cohort")
 
 
-def plot_marriages_remarriage():
+def plot_marriages_remarriage(df, fig=None):
     """Mean marriages and remarriage probability (wave2)."""
-    df = pd.read_excel(TABLES_XLSX, sheet_name="stacked_primary_all_by_wave")
-    df = df[df["wave"] == "wave2"].copy()
-    df = df[df["N_age_le_35"] >= 50]
-    
     if df.empty:
         print("No sufficient data for marriages plot")
         return
     
-    cohorts = sorted(df["cohort_primary"].dropna().unique(), key=cohort_sort_key)
+    cohorts, wide = pivot_by_sex(df)
     cohort_labels = [format_cohort_label(c) for c in cohorts]
     x = np.arange(len(cohorts))
     
-    fig, axes = plt.subplots(1, 2, figsize=(12, 5))
+    fig = reuse_figure(fig, figsize=(12, 5))
+    axes = fig.subplots(1, 2)
     
     # ─── Panel A: Mean marriages ───
     ax = axes[0]
     for sex in ["Male", "Female"]:
-        s = df[df["sex_label"] == sex].copy()
-        s["cohort_primary"] = pd.Categorical(s["cohort_primary"], categories=cohorts, ordered=True)
-        s = s.sort_values("cohort_primary").reset_index(drop=True)
-        
-        y = s["mean_marriages_if_partnered"].values
-        ax.plot(x[:len(y)], y, marker="o", color=COLORS[sex], label=sex,
+        y = wide[("mean_marriages_if_partnered", sex)].to_numpy()
+        ax.plot(x, y, marker="o", color=COLORS[sex], label=sex,
                 markerfacecolor="white", markeredgewidth=2)
     
     ax.set_xticks(x)
@@ -248,12 +326,8 @@ def plot_marriages_remarriage():
     # ─── Panel B: Remarriage probability ───
     ax = axes[1]
     for sex in ["Male", "Female"]:
-        s = df[df["sex_label"] == sex].copy()
-        s["cohort_primary"] = pd.Categorical(s["cohort_primary"], categories=cohorts, ordered=True)
-        s = s.sort_values("cohort_primary").reset_index(drop=True)
-        
-        y = s["p_remarried_2plus_if_partnered"].values
-        ax.plot(x[:len(y)], y, marker="o", color=COLORS[sex], label=sex,
+        y = wide[("p_remarried_2plus_if_partnered", sex)].to_numpy()
+        ax.plot(x, y, marker="o", color=COLORS[sex], label=sex,
                 markerfacecolor="white", markeredgewidth=2)
     
     ax.set_xticks(x)
@@ -268,43 +342,35 @@ def plot_marriages_remarriage():
     fig.suptitle("Marriage Patterns by Birth Cohort — NSFH Wave 2 (1992–1994)",
                  fontsize=14, fontweight="bold", y=1.02)
     
-    plt.tight_layout()
-    plt.savefig(OUTDIR / "marriages_remarriage_panel.png", dpi=300, bbox_inches="tight")
-    plt.savefig(OUTDIR / "marriages_remarriage_panel.pdf", bbox_inches="tight")
-    plt.close()
-    print("Saved: marriages_remarriage_panel")
+    fig.tight_layout()
+    save_figure(fig, "marriages_remarriage_panel")
 
 
-def plot_combined_summary():
+def plot_combined_summary(df, fig=None, ci=None, gap=None):
     """Single figure combining key findings."""
-    df = pd.read_excel(TABLES_XLSX, sheet_name="stacked_primary_all_by_wave")
-    df = df[df["wave"] == "wave2"].copy()
-    df = df[df["N_age_le_35"] >= 50]
-    
     if df.empty:
         print("No sufficient data for combined plot")
         return
     
-    cohorts = sorted(df["cohort_primary"].dropna().unique(), key=cohort_sort_key)
+    cohorts, wide = pivot_by_sex(df)
+    if ci is None:
+        ci = compute_ci(df)
     cohort_labels = [format_cohort_label(c) for c in cohorts]
     x = np.arange(len(cohorts))
     
-    fig, axes = plt.subplots(2, 2, figsize=(11, 9))
+    fig = reuse_figure(fig, figsize=(11, 9))
+    axes = fig.subplots(2, 2)
     
     # ─── Panel A: Ever partnered ───
     ax = axes[0, 0]
     for sex in ["Male", "Female"]:
-        s = df[df["sex_label"] == sex].copy()
-        s["cohort_primary"] = pd.Categorical(s["cohort_primary"], categories=cohorts, ordered=True)
-        s = s.sort_values("cohort_primary").reset_index(drop=True)
-        
-        p = s["p_ever_partnered"].values
-        n = s["N_age_le_35"].values
-        lo, hi = add_ci(p, n)
+        p = ci[("p", sex)].to_numpy()
+        lo = ci[("lo", sex)].to_numpy()
+        hi = ci[("hi", sex)].to_numpy()
         
-        ax.fill_between(x[:len(p)], lo, hi, alpha=COLORS["ci_alpha"], 
+        ax.fill_between(x, lo, hi, alpha=COLORS["ci_alpha"], 
                         color=COLORS[sex], linewidth=0)
-        ax.plot(x[:len(p)], p, marker="o", color=COLORS[sex], label=sex,
+        ax.plot(x, p, marker="o", color=COLORS[sex], label=sex,
                 markerfacecolor="white", markeredgewidth=2)
     
     ax.set_xticks(x)
@@ -317,22 +383,8 @@ def plot_combined_summary():
     
     # ─── Panel B: Partnership gap ───
     ax = axes[0, 1]
-    f = df[df["sex_label"] == "Female"][["cohort_primary", "p_ever_partnered", "N_age_le_35"]].copy()
-    m = df[df["sex_label"] == "Male"][["cohort_primary", "p_ever_partnered", "N_age_le_35"]].copy()
-    g = f.merge(m, on="cohort_primary", suffixes=("_F", "_M"))
-    g = g[(g["N_age_le_35_F"] >= 50) & (g["N_age_le_35_M"] >= 50)]
-    
-    g["gap"] = g["p_ever_partnered_F"] - g["p_ever_partnered_M"]
-    g["se"] = np.sqrt(
-        g["p_ever_partnered_F"] * (1 - g["p_ever_partnered_F"]) / g["N_age_le_35_F"] +
-        g["p_ever_partnered_M"] * (1 - g["p_ever_partnered_M"]) / g["N_age_le_35_M"]
-    )
-    g["lo"] = g["gap"] - 1.96 * g["se"]
-    g["hi"] = g["gap"] + 1.96 * g["se"]
-    
-    gap_cohorts = sorted(g["cohort_primary"].unique(), key=cohort_sort_key)
-    g["cohort_primary"] = pd.Categorical(g["cohort_primary"], categories=gap_cohorts, ordered=True)
-    g = g.sort_values("cohort_primary").reset_index(drop=True)
+    g = compute_gap(df) if gap is None else gap
+    gap_cohorts = list(g.index)
     x_gap = np.arange(len(g))
     
     ax.fill_between(x_gap, g["lo"], g["hi"], alpha=COLORS["ci_alpha"], 
@@ -350,12 +402,8 @@ def plot_combined_summary():
     # ─── Panel C: Mean marriages ───
     ax = axes[1, 0]
     for sex in ["Male", "Female"]:
-        s = df[df["sex_label"] == sex].copy()
-        s["cohort_primary"] = pd.Categorical(s["cohort_primary"], categories=cohorts, ordered=True)
-        s = s.sort_values("cohort_primary").reset_index(drop=True)
-        
-        y = s["mean_marriages_if_partnered"].values
-        ax.plot(x[:len(y)], y, marker="o", color=COLORS[sex], label=sex,
+        y = wide[("mean_marriages_if_partnered", sex)].to_numpy()
+        ax.plot(x, y, marker="o", color=COLORS[sex], label=sex,
                 markerfacecolor="white", markeredgewidth=2)
     
     ax.set_xticks(x)
@@ -369,12 +417,8 @@ def plot_combined_summary():
     # ─── Panel D: Remarriage rate ───
     ax = axes[1, 1]
     for sex in ["Male", "Female"]:
-        s = df[df["sex_label"] == sex].copy()
-        s["cohort_primary"] = pd.Categorical(s["cohort_primary"], categories=cohorts, ordered=True)
-        s = s.sort_values("cohort_primary").reset_index(drop=True)
-        
-        y = s["p_remarried_2plus_if_partnered"].values
-        ax.plot(x[:len(y)], y, marker="o", color=COLORS[sex], label=sex,
+        y = wide[("p_remarried_2plus_if_partnered", sex)].to_numpy()
+        ax.plot(x, y, marker="o", color=COLORS[sex], label=sex,
                 markerfacecolor="white", markeredgewidth=2)
     
     ax.set_xticks(x)
@@ -389,16 +433,18 @@ def plot_combined_summary():
     fig.suptitle("Partnership and Marriage Patterns by Birth Cohort\nNSFH Wave 2 (1992–1994)",
                  fontsize=14, fontweight="bold")
     
-    plt.tight_layout(rect=[0, 0, 1, 0.95])
-    plt.savefig(OUTDIR / "nsfh_combined_summary.png", dpi=300, bbox_inches="tight")
-    plt.savefig(OUTDIR / "nsfh_combined_summary.pdf", bbox_inches="tight")
-    plt.close()
-    print("Saved: nsfh_combined_summary")
+    fig.tight_layout(rect=[0, 0, 1, 0.95])
+    save_figure(fig, "nsfh_combined_summary")
 
 
 if __name__ == "__main__":
-    plot_ever_partnered()
-    plot_partnership_gap()
-    plot_marriages_remarriage()
-    plot_combined_summary()
+    df_w2 = load_wave2_tables()
+    # Shared by the single plots and the combined summary
+    ci = compute_ci(df_w2)
+    gap = compute_gap(df_w2)
+    fig = new_figure()  # one Figure/canvas, cleared and resized by each plot
+    plot_ever_partnered(df_w2, fig, ci=ci)
+    plot_partnership_gap(df_w2, fig, gap=gap)
+    plot_marriages_remarriage(df_w2, fig)
+    plot_combined_summary(df_w2, fig, ci=ci, gap=gap)
     print(f"\nAll figures saved to {OUTDIR}/")
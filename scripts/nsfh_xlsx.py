@@ -0,0 +1,112 @@
+"""
+nsfh_xlsx.py
+
+xlsx writers shared by the replication scripts.
+
+- write_xlsx: streams frames through xlsxwriter's constant_memory mode
+  (replicate_nsfh_wave1.py, replicate_nsfh_stacked.py).
+- write_analytic_xlsx_fast: emits the analytic sheet's worksheet XML directly and zips
+  it with the minimal OOXML parts (replicate_nsfh_wave2.py, replicate_nsfh_wave3.py;
+  --analytic_format xlsx).
+"""
+
+from __future__ import annotations
+import zipfile
+from pathlib import Path
+from xml.sax.saxutils import escape
+
+import pandas as pd
+import xlsxwriter
+
+def write_xlsx(path: Path, sheets: dict[str, pd.DataFrame], chunk_rows: int = 10_000) -> None:
+    """Write frames to an xlsx with xlsxwriter's constant_memory mode.
+
+    constant_memory flushes a row as soon as a later row is started, so cells have to
+    arrive row by row. DataFrame.to_excel writes column by column and would keep only
+    the last row of every column, so rows are streamed here with write_row instead.
+    """
+    with xlsxwriter.Workbook(str(path), {"constant_memory": True}) as wb:
+        # Same header look as pandas' to_excel
+        header = wb.add_format({"bold": True, "border": 1, "align": "center", "valign": "top"})
+        for sheet_name, df in sheets.items():
+            ws = wb.add_worksheet(sheet_name)
+            ws.write_row(0, 0, [str(c) for c in df.columns], header)
+            for start in range(0, len(df), chunk_rows):
+                chunk = df.iloc[start:start + chunk_rows].astype(object)
+                chunk = chunk.where(chunk.notna(), None)  # blanks for NaN/NA, as to_excel writes them
+                for i, row in enumerate(chunk.itertuples(index=False, name=None), start=start + 1):
+                    ws.write_row(i, 0, row)
+
+# Minimal OOXML package parts for a single-sheet workbook (no styles, no shared strings)
+_XLSX_PARTS = {
+    "[Content_Types].xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    "_rels/.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+        'Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    "xl/workbook.xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="analytic" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'
+    ),
+    "xl/_rels/workbook.xml.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+        'Target="worksheets/sheet1.xml"/>'
+        '</Relationships>'
+    ),
+}
+
+def _inline_str(v) -> str:
+    # preserve keeps leading/trailing spaces, which readers would otherwise strip
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{escape(str(v))}</t></is></c>'
+
+def _xlsx_cells(s: pd.Series) -> list[str]:
+    """Cell XML for one column; missing values become empty cells, like to_excel's blanks."""
+    if pd.api.types.is_bool_dtype(s.dtype):
+        cell = '<c t="b"><v>{:d}</v></c>'.format
+    elif pd.api.types.is_numeric_dtype(s.dtype):
+        cell = "<c><v>{}</v></c>".format
+    else:
+        cell = _inline_str
+    return ["<c/>" if v is None else cell(v) for v in s.astype(object).where(s.notna(), None).tolist()]
+
+def write_analytic_xlsx_fast(analytic: pd.DataFrame, path: Path, chunk_rows: int = 10_000) -> None:
+    """Write the analytic frame as a one-sheet xlsx (sheet: analytic).
+
+    The sheet holds a header row, numbers and inline strings, with no styling. Rows are
+    built chunk_rows at a time, column by column, and streamed into the zip.
+    """
+    with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for name, xml in _XLSX_PARTS.items():
+            zf.writestr(name, xml)
+        with zf.open("xl/worksheets/sheet1.xml", "w", force_zip64=True) as f:
+            f.write(b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                    b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>')
+            header = "".join(_inline_str(c) for c in analytic.columns)
+            f.write(f'<row r="1">{header}</row>'.encode())
+            for start in range(0, len(analytic), chunk_rows):
+                chunk = analytic.iloc[start:start + chunk_rows]
+                cols = [_xlsx_cells(chunk[c]) for c in chunk.columns]
+                rows = "".join(f'<row r="{i}">{"".join(cells)}</row>'
+                               for i, cells in enumerate(zip(*cols), start=start + 2))
+                f.write(rows.encode())
+            f.write(b"</sheetData></worksheet>")
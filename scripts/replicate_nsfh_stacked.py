@@ -9,6 +9,8 @@ Inputs (defaults; override via CLI):
 - NSFH_Wave1_analytic_replication_ready.xlsx  (sheet: analytic)
 - NSFH_Wave2_analytic_replication_ready.xlsx  (sheet: analytic)
 - NSFH_Wave3_analytic_replication_ready.xlsx  (sheet: analytic)
+  Each input may also be the .parquet extract the wave scripts write by default;
+  when a given .xlsx does not exist, the .parquet next to it is used.
 
 Outputs:
 - NSFH_stacked_analytic_replication_ready.xlsx (sheet: analytic)
@@ -19,6 +21,9 @@ Outputs:
     - stacked_primary_all_by_wave
     - stacked_primary_present_by_wave
     - stacked_ever_partnered_gap_by_wave
+- NSFH_stacked_analytic.parquet and one NSFH_<sheet>.parquet per tables sheet
+  (zstd; skipped with a warning if no Parquet engine is installed). Downstream
+  scripts read these instead of re-parsing the workbooks.
 
 Notes:
 - The script preserves *existing* variable definitions from each wave package.
@@ -26,6 +31,8 @@ Notes:
 - Cohort fields are standardized to:
     cohort_primary, cohort_macro
   by renaming wave-specific equivalents when needed.
+- --core_columns reads only the id, cohort and table-input columns from each wave,
+  which is much faster when only the tables are needed.
 """
 
 from __future__ import annotations
@@ -35,8 +42,40 @@ from pathlib import Path
 import pandas as pd
 import numpy as np
 
-def read_analytic(xlsx_path: Path, wave: str) -> pd.DataFrame:
-    df = pd.read_excel(xlsx_path, sheet_name="analytic", engine="openpyxl")
+from nsfh_xlsx import write_xlsx
+
+# Grouping keys; held as categoricals so groupby hashes integer codes instead of strings
+KEY_COLUMNS = ["wave", "sex_label", "cohort_primary"]
+
+# Small-integer columns used by the tables, downcast to nullable ints on read.
+# The 0/1 flags stay Int8 (not boolean) so the analytic workbook keeps writing 0/1.
+NUMERIC_DTYPES = {
+    "age": "Int16",
+    "sex": "Int8",
+    "num_marriages": "Int8",
+    "num_cohab_partners": "Int8",
+    "ever_partnered": "Int8",
+    "remarried_2plus": "Int8",
+    "age_le_35": "Int8",
+}
+
+# Columns compute_tables needs (under any wave's naming), plus respondent ids
+CORE_COLUMNS = {
+    "caseid", "MCASEID",
+    "age", "sex", "sex_label", "age_le_35",
+    "num_marriages", "num_cohab_partners", "ever_partnered", "remarried_2plus",
+    "cohort_primary", "primary_cohort", "cohort_macro", "macro_cohort",
+}
+
+def read_analytic(xlsx_path: Path, wave: str, core_only: bool = False) -> pd.DataFrame:
+    if xlsx_path.suffix == ".parquet":
+        df = pd.read_parquet(xlsx_path)
+        if core_only:
+            df = df[[c for c in df.columns if c in CORE_COLUMNS]]
+    else:
+        # A callable usecols tolerates columns that a given wave does not have
+        usecols = CORE_COLUMNS.__contains__ if core_only else None
+        df = pd.read_excel(xlsx_path, sheet_name="analytic", engine="openpyxl", usecols=usecols)
     df["wave"] = wave
 
     # Standardize cohort columns across waves
@@ -55,18 +94,40 @@ def read_analytic(xlsx_path: Path, wave: str) -> pd.DataFrame:
     if "age_le_35" not in df.columns and "age" in df.columns:
         df["age_le_35"] = (pd.to_numeric(df["age"], errors="coerce") <= 35).astype("Int64")
 
+    for c in KEY_COLUMNS:
+        if c in df.columns:
+            df[c] = df[c].astype("category")
+    for c, dtype in NUMERIC_DTYPES.items():
+        if c in df.columns:
+            df[c] = pd.to_numeric(df[c], errors="coerce").astype(dtype)
+
     return df
 
+def cohort_order(labels) -> list[str]:
+    """Chronological order of cohort labels (≤ first, ≥ last); label styles differ by wave."""
+    u = pd.Series(labels).astype(str)
+    nums = u.str.extract(r"(\d+)")[0].astype(float).to_numpy()
+    key = np.where(u.str.startswith("≤"), -10000,
+                   np.where(u.str.startswith("≥"), np.nan_to_num(nums, nan=10000), np.nan_to_num(nums)))
+    return u.iloc[np.argsort(key, kind="stable")].tolist()
+
 def stack_align(dfs: list[pd.DataFrame]) -> pd.DataFrame:
-    # union of columns
-    cols = sorted(set().union(*[set(d.columns) for d in dfs]))
-    out = []
-    for d in dfs:
-        missing = [c for c in cols if c not in d.columns]
-        for c in missing:
-            d[c] = pd.NA
-        out.append(d[cols])
-    stacked = pd.concat(out, ignore_index=True)
+    # concat aligns on the union of columns and fills the gaps itself; columns stay
+    # sorted by name as before (sort=True only sorts when the frames are misaligned)
+    stacked = pd.concat(dfs, ignore_index=True, sort=True)
+    if not stacked.columns.is_monotonic_increasing:
+        stacked = stacked.sort_index(axis=1)
+    # concat falls back to object when the per-wave categories differ
+    for c in KEY_COLUMNS:
+        if c in stacked.columns:
+            stacked[c] = stacked[c].astype("category")
+    # Chronological cohort categories, so every groupby/pivot downstream comes out in
+    # canonical (wave, cohort, sex) order and the written tables can be plotted as-is
+    if "cohort_primary" in stacked.columns:
+        cohort = stacked["cohort_primary"]
+        stacked["cohort_primary"] = cohort.cat.reorder_categories(
+            cohort_order(cohort.cat.categories), ordered=True
+        )
     return stacked
 
 def compute_tables(analytic: pd.DataFrame, n_threshold: int = 200, by_wave: bool = True) -> dict[str, pd.DataFrame]:
@@ -83,36 +144,38 @@ def compute_tables(analytic: pd.DataFrame, n_threshold: int = 200, by_wave: bool
     if by_wave:
         group_keys = ["wave"] + group_keys
 
-    def metric_frame(d: pd.DataFrame) -> pd.Series:
-        p_partnered = d["ever_partnered"].mean()
-        partnered = d.loc[d["ever_partnered"] == 1]
-        return pd.Series({
-            "N_age_le_35": len(d),
-            "p_ever_partnered": p_partnered,
-            "mean_cohab_partners_if_partnered": partnered["num_cohab_partners"].mean(),
-            "mean_marriages_if_partnered": partnered["num_marriages"].mean(),
-            "p_remarried_2plus_if_partnered": partnered["remarried_2plus"].mean(),
-        })
-
-    primary_all = a35.groupby(group_keys, dropna=False).apply(metric_frame).reset_index()
-
-    # Determine "present" cohorts (both sexes >= threshold) within each wave if by_wave else pooled
-    if by_wave:
-        present_rows = []
-        for w, sub in primary_all.groupby("wave", dropna=False):
-            n_by = sub.pivot(index="cohort_primary", columns="sex_label", values="N_age_le_35")
-            keep = n_by.dropna().loc[(n_by.get("Female", 0) >= n_threshold) & (n_by.get("Male", 0) >= n_threshold)].index
-            present_rows.append(sub.loc[sub["cohort_primary"].isin(keep)])
-        primary_present = pd.concat(present_rows, ignore_index=True) if present_rows else primary_all.iloc[0:0].copy()
-    else:
-        n_by = primary_all.pivot(index="cohort_primary", columns="sex_label", values="N_age_le_35")
-        keep = n_by.dropna().loc[(n_by.get("Female", 0) >= n_threshold) & (n_by.get("Male", 0) >= n_threshold)].index
-        primary_present = primary_all.loc[primary_all["cohort_primary"].isin(keep)].copy()
+    # Vectorized per-group metrics; the "if partnered" means are taken over the partnered subset
+    g = a35.groupby(group_keys, observed=True, dropna=False)
+    partnered = a35.loc[a35["ever_partnered"] == 1]
+    if_partnered = partnered.groupby(group_keys, observed=True, dropna=False)[
+        ["num_cohab_partners", "num_marriages", "remarried_2plus"]
+    ].mean()
+    if_partnered.columns = [
+        "mean_cohab_partners_if_partnered",
+        "mean_marriages_if_partnered",
+        "p_remarried_2plus_if_partnered",
+    ]
+    primary_all = pd.concat(
+        [g.size().rename("N_age_le_35"), g["ever_partnered"].mean().rename("p_ever_partnered"), if_partnered],
+        axis=1,
+    ).reset_index()
+
+    # Determine "present" cohorts (both sexes >= threshold) within each wave if by_wave else pooled,
+    # from one wide table of N with a column per sex
+    cell_keys = group_keys[:-1]
+    n_by = (
+        primary_all.set_index(group_keys)["N_age_le_35"]
+        .unstack("sex_label")
+        .reindex(columns=["Female", "Male"])
+    )
+    keep = n_by.index[(n_by >= n_threshold).all(axis=1)]
+    present = primary_all.set_index(cell_keys).index.isin(keep)
+    primary_present = primary_all.loc[present].reset_index(drop=True)
 
     # Gap table
     if by_wave:
         gap_rows = []
-        for w, sub in primary_present.groupby("wave", dropna=False):
+        for w, sub in primary_present.groupby("wave", observed=True, dropna=False):
             p_by = sub.pivot(index="cohort_primary", columns="sex_label", values="p_ever_partnered")
             gap = (p_by.get("Female") - p_by.get("Male")).rename("female_minus_male_p_ever_partnered").reset_index()
             gap.insert(0, "wave", w)
@@ -135,6 +198,8 @@ def main():
     ap.add_argument("--wave3_xlsx", default="NSFH_Wave3_analytic_replication_ready.xlsx")
     ap.add_argument("--out_dir", default=".")
     ap.add_argument("--n_threshold", type=int, default=200)
+    ap.add_argument("--core_columns", action="store_true",
+                    help="Read and stack only the id/cohort/table columns instead of every analytic column")
     args = ap.parse_args()
 
     out_dir = Path(args.out_dir)
@@ -149,8 +214,10 @@ def main():
     dfs = []
     present_inputs = []
     for wave, p in inputs:
+        if not p.exists() and p.with_suffix(".parquet").exists():
+            p = p.with_suffix(".parquet")
         if p.exists():
-            dfs.append(read_analytic(p, wave))
+            dfs.append(read_analytic(p, wave, core_only=args.core_columns))
             present_inputs.append((wave, p.name))
         else:
             print(f"WARNING: missing {p} (skipping {wave})")
@@ -161,23 +228,38 @@ def main():
     stacked = stack_align(dfs)
 
     out_analytic = out_dir / "NSFH_stacked_analytic_replication_ready.xlsx"
-    with pd.ExcelWriter(out_analytic, engine="openpyxl") as xw:
-        stacked.to_excel(xw, sheet_name="analytic", index=False)
+    write_xlsx(out_analytic, {"analytic": stacked})
 
     # Pooled tables (across waves)
     pooled = compute_tables(stacked, n_threshold=args.n_threshold, by_wave=False)
     # By-wave tables
     bywave = compute_tables(stacked, n_threshold=args.n_threshold, by_wave=True)
 
+    sheets = {
+        "stacked_primary_all": pooled["primary_all"],
+        "stacked_primary_present": pooled["primary_present"],
+        "stacked_ever_partnered_gap": pooled["ever_partnered_gap"],
+        "stacked_primary_all_by_wave": bywave["primary_all"],
+        "stacked_primary_present_by_wave": bywave["primary_present"],
+        "stacked_ever_partnered_gap_by_wave": bywave["ever_partnered_gap"],
+    }
+
+    # The tables workbook is tiny and stays on openpyxl: xlsxwriter rejects sheet names
+    # over Excel's 31 characters, such as stacked_ever_partnered_gap_by_wave.
     out_tables = out_dir / "NSFH_stacked_tables.xlsx"
     with pd.ExcelWriter(out_tables, engine="openpyxl") as xw:
-        pooled["primary_all"].to_excel(xw, sheet_name="stacked_primary_all", index=False)
-        pooled["primary_present"].to_excel(xw, sheet_name="stacked_primary_present", index=False)
-        pooled["ever_partnered_gap"].to_excel(xw, sheet_name="stacked_ever_partnered_gap", index=False)
-
-        bywave["primary_all"].to_excel(xw, sheet_name="stacked_primary_all_by_wave", index=False)
-        bywave["primary_present"].to_excel(xw, sheet_name="stacked_primary_present_by_wave", index=False)
-        bywave["ever_partnered_gap"].to_excel(xw, sheet_name="stacked_ever_partnered_gap_by_wave", index=False)
+        for sheet_name, table in sheets.items():
+            table.to_excel(xw, sheet_name=sheet_name, index=False)
+
+    # Parquet copies for downstream reads; written after the workbooks so they are never older.
+    parquet_outputs = [(stacked, out_dir / "NSFH_stacked_analytic.parquet")]
+    parquet_outputs += [(table, out_dir / f"NSFH_{sheet_name}.parquet") for sheet_name, table in sheets.items()]
+    try:
+        for frame, path in parquet_outputs:
+            frame.to_parquet(path, compression="zstd", index=False)
+    except ImportError as e:
+        print(f"WARNING: no Parquet engine available ({e}); skipping .parquet outputs")
+        parquet_outputs = []
 
     print("Inputs used:")
     for wave, name in present_inputs:
@@ -185,6 +267,8 @@ def main():
     print("Wrote:")
     print(f" - {out_analytic}")
     print(f" - {out_tables}")
+    for _, path in parquet_outputs:
+        print(f" - {path}")
 
 if __name__ == "__main__":
     main()
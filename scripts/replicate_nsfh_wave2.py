@@ -5,7 +5,7 @@ replicate_nsfh_wave2.py
 End-to-end replication script for NSFH Wave 2 (1992–94) main respondent file (DS0001).
 
 Reads the raw Wave 2 TSV and writes:
-- NSFH_Wave2_analytic_replication_ready.xlsx (sheet: analytic)
+- NSFH_Wave2_analytic_replication_ready.parquet (or .xlsx, sheet: analytic, with --analytic_format xlsx)
 - NSFH_Wave2_tables.xlsx (sheets: primary_all, primary_present, ever_partnered_gap)
 
 IMPORTANT (Wave-2-specific forced deviations):
@@ -20,51 +20,107 @@ from pathlib import Path
 import numpy as np
 import pandas as pd
 
+from nsfh_groups import encode_groups, group_mean
+from nsfh_xlsx import write_analytic_xlsx_fast
+
 COMMON_MISS = {7,8,9,97,98,99,997,998,999,9997,9998,9999,99997,99998,99999}
 
+MACRO_BINS = [-np.inf, 1949, 1959, 1969, 1979, np.inf]
+MACRO_LABELS = ["≤1949", "1950–59", "1960–69", "1970–79", "≥1980"]
+
+# The multi-threaded pyarrow CSV parser is much faster on the raw TSV; the C parser is the fallback
+try:
+    import pyarrow  # noqa: F401
+    CSV_ENGINE = "pyarrow"
+except ImportError:
+    CSV_ENGINE = "c"
+
+# Optional: --engine polars runs the read/recode/aggregate steps in polars
+try:
+    import polars as pl
+except ImportError:
+    pl = None
+
 def to_num(s: pd.Series) -> pd.Series:
     return pd.to_numeric(s, errors="coerce")
 
+def read_tsv_chunks(path, chunksize, **kwargs):
+    """Read a TSV as a sequence of DataFrame chunks.
+
+    With chunksize None the (usecols-narrowed) file comes back as a single chunk, parsed
+    by pyarrow when available. pyarrow has no chunksize, so a chunked read always goes
+    through the C parser, chunksize rows at a time.
+    """
+    if chunksize is None:
+        if CSV_ENGINE == "pyarrow":
+            return [pd.read_csv(path, sep="\t", engine="pyarrow", **kwargs)]
+        return [pd.read_csv(path, sep="\t", low_memory=False, **kwargs)]
+    return pd.read_csv(path, sep="\t", low_memory=False, chunksize=chunksize, **kwargs)
+
 def recode_missing_numeric(x: pd.Series, miss_codes) -> pd.Series:
     x = to_num(x)
-    for c in miss_codes:
-        x = x.mask(x == c)
-    return x
-
-def macro_bin(by):
-    if pd.isna(by): return np.nan
-    by=int(by)
-    if by <= 1949: return "≤1949"
-    if 1950 <= by <= 1959: return "1950–59"
-    if 1960 <= by <= 1969: return "1960–69"
-    if 1970 <= by <= 1979: return "1970–79"
-    return "≥1980"
+    return x.mask(x.isin(list(miss_codes)))
 
 def cohort_sex_table(df_a: pd.DataFrame, cohort_col: str, only_present: bool, min_n: int) -> pd.DataFrame:
-    d = df_a.copy()
-    d = d[d["age_le_35"]==1]
+    d = df_a[df_a["age_le_35"]==1]
     if only_present:
         d = d[d[cohort_col].notna()]
 
-    grouped = d.groupby([cohort_col, "sex_label"], dropna=False)
-    out = grouped.size().rename("N").reset_index()
-
-    out = out.merge(grouped["ever_partnered"].mean().rename("P_ever_partnered").reset_index(),
-                    on=[cohort_col, "sex_label"], how="left")
-
-    partnered = d[d["ever_partnered"]==1]
-    g2 = partnered.groupby([cohort_col, "sex_label"], dropna=False)
-
-    out = out.merge(g2["num_cohab_partners"].mean().rename("Mean_num_cohab_partners_if_partnered").reset_index(),
-                    on=[cohort_col, "sex_label"], how="left")
-    out = out.merge(g2["num_marriages"].mean().rename("Mean_num_marriages_if_partnered").reset_index(),
-                    on=[cohort_col, "sex_label"], how="left")
-    out = out.merge(g2["remarried_2plus"].mean().rename("P_remarried_2plus_if_partnered").reset_index(),
-                    on=[cohort_col, "sex_label"], how="left")
-
+    keys = [cohort_col, "sex_label"]
+    gid, out = encode_groups(d, keys)
+    ng = len(out)
+    ever_partnered = d["ever_partnered"].to_numpy(dtype=float)
+    out["N"] = np.bincount(gid, minlength=ng)
+    out["P_ever_partnered"] = group_mean(ever_partnered, gid, ng)
+
+    # Means among the partnered: other rows are NaN so they drop out of the mean
+    partnered = ever_partnered == 1
+    for name, col in [("Mean_num_cohab_partners_if_partnered", "num_cohab_partners"),
+                      ("Mean_num_marriages_if_partnered", "num_marriages"),
+                      ("P_remarried_2plus_if_partnered", "remarried_2plus")]:
+        out[name] = group_mean(np.where(partnered, d[col].to_numpy(dtype=float), np.nan), gid, ng)
+    return keep_present_cohorts(out, cohort_col, min_n)
+
+def cohort_sex_table_polars(df_a, cohort_col: str, only_present: bool, min_n: int) -> pd.DataFrame:
+    """cohort_sex_table on a polars analytic frame; the (small) result comes back as pandas."""
+    d = df_a.filter(pl.col("age_le_35") == 1)
+    if only_present:
+        d = d.filter(pl.col(cohort_col).is_not_null())
+
+    keys = [cohort_col, "sex_label"]
+    out = d.group_by(keys).agg(
+        N=pl.len().cast(pl.Int64),
+        P_ever_partnered=pl.col("ever_partnered").mean(),
+    )
+    agg_p = d.filter(pl.col("ever_partnered") == 1).group_by(keys).agg(
+        Mean_num_cohab_partners_if_partnered=pl.col("num_cohab_partners").mean(),
+        Mean_num_marriages_if_partnered=pl.col("num_marriages").mean(),
+        P_remarried_2plus_if_partnered=pl.col("remarried_2plus").mean(),
+    )
+    # Same row order as the pandas groupby: category order, missing keys last
+    out = out.join(agg_p, on=keys, how="left", nulls_equal=True).sort(keys, nulls_last=True)
+    return keep_present_cohorts(out.to_pandas(), cohort_col, min_n)
+
+def keep_present_cohorts(out: pd.DataFrame, cohort_col: str, min_n: int) -> pd.DataFrame:
     pivotN = out.pivot(index=cohort_col, columns="sex_label", values="N")
-    keep = pivotN.dropna().index[(pivotN.dropna()>=min_n).all(axis=1)]
-    return out[out[cohort_col].isin(keep)].copy()
+    keep = pivotN.index[pivotN.notna().all(axis=1) & (pivotN.fillna(0) >= min_n).all(axis=1)]
+    col = out[cohort_col]
+    if isinstance(col.dtype, pd.CategoricalDtype):
+        # Look kept cohorts up by category code; a kept missing cohort (indexer -1) lands in
+        # the extra last slot, which is also where code -1 rows look, as isin would match NaN
+        keep_code = np.zeros(len(col.cat.categories) + 1, dtype=bool)
+        keep_code[col.cat.categories.get_indexer(keep)] = True
+        return out[keep_code[col.cat.codes.to_numpy()]].copy()
+    return out[col.isin(keep)].copy()
+
+def primary_bins(birth_year_le35):
+    """5-year bins (and YYYY-YYYY+4 labels) spanning the observed birth years among age<=35."""
+    min_by, max_by = birth_year_le35.min(), birth_year_le35.max()
+    start = (min_by // 5) * 5
+    end = ((max_by // 5) * 5) + 4
+    bins = list(range(start, end+2, 5))
+    labels = [f"{b}-{b+4}" for b in bins[:-1]]
+    return bins, labels
 
 def gap_table(tab: pd.DataFrame, cohort_col: str) -> pd.DataFrame:
     pvt = tab.pivot(index=cohort_col, columns="sex_label", values="P_ever_partnered")
@@ -77,88 +133,173 @@ def main():
     ap.add_argument("--out_dir", default=".", help="Output directory.")
     ap.add_argument("--interview_year", type=int, default=1993, help="Interview year used to compute birth_year.")
     ap.add_argument("--min_n", type=int, default=200, help="Minimum N per sex within cohort for inclusion.")
+    ap.add_argument("--analytic_format", choices=["parquet", "xlsx"], default="parquet",
+                    help="Format of the analytic extract (parquet is much faster to write and read).")
+    ap.add_argument("--chunksize", type=int, default=None,
+                    help="Read and recode the raw TSV this many rows at a time to bound peak memory "
+                         "(default: the whole file in one pass; a chunked read uses the C parser).")
+    ap.add_argument("--engine", choices=["pandas", "polars"], default="pandas",
+                    help="Library used to read, recode and aggregate (polars parallelizes these steps).")
+    ap.add_argument("--include_raw_audit", action="store_true",
+                    help="Carry the raw source variables into the analytic extract for auditing.")
     args = ap.parse_args()
+    if args.engine == "polars" and pl is None:
+        ap.error("--engine polars requires the polars package")
+    if args.chunksize is not None:
+        if args.engine == "polars":
+            ap.error("--chunksize applies to the pandas engine only")
+        if CSV_ENGINE == "pyarrow":
+            print(f"--chunksize {args.chunksize}: reading in chunks with the C parser instead of pyarrow's one-pass parse")
 
     raw_path = Path(args.raw_tsv)
     out_dir = Path(args.out_dir)
     out_dir.mkdir(parents=True, exist_ok=True)
 
-    df = pd.read_csv(raw_path, sep="\t", low_memory=False)
-
     age_src = "MA8"
     sex_src = "MA7"
     marriages_src = "MI41"
     cohab_n_src = "MI140"
     married_since_src = "MI40"
     cohab_since_src = "MI42"
-
-    for v in [age_src, sex_src, marriages_src, cohab_n_src, married_since_src, cohab_since_src]:
-        if v not in df.columns:
+    src_vars = [age_src, sex_src, marriages_src, cohab_n_src, married_since_src, cohab_since_src]
+    # Raw source variables carried into the analytic extract for auditability (--include_raw_audit)
+    src_audit = {
+        "src_age_var": age_src,
+        "src_sex_var": sex_src,
+        "src_MI40_married_since": married_since_src,
+        "src_MI41_times_married_since": marriages_src,
+        "src_MI42_cohab_since": cohab_since_src,
+        "src_MI140_num_cohab_partners": cohab_n_src,
+    } if args.include_raw_audit else {}
+
+    header = pd.read_csv(raw_path, sep="\t", nrows=0).columns
+    for v in src_vars:
+        if v not in header:
             raise ValueError(f"Expected variable {v} not found in {raw_path.name}")
 
-    age = recode_missing_numeric(df[age_src], COMMON_MISS)
-    sex = recode_missing_numeric(df[sex_src], COMMON_MISS)
-    birth_year = args.interview_year - age
-
-    num_marriages = recode_missing_numeric(df[marriages_src], COMMON_MISS)
-    num_cohab_partners = recode_missing_numeric(df[cohab_n_src], COMMON_MISS)
-
-    mi40 = recode_missing_numeric(df[married_since_src], COMMON_MISS)
-    mi42 = recode_missing_numeric(df[cohab_since_src], COMMON_MISS)
-
-    ever_married = np.where((num_marriages >= 1) | (mi40 == 1), 1, np.where(mi40.isna() & num_marriages.isna(), np.nan, 0))
-    remarried_2plus = np.where(num_marriages >= 2, 1, np.where(num_marriages.isna(), np.nan, 0))
-    ever_cohabited = np.where((num_cohab_partners >= 1) | (mi42 == 1), 1, np.where(mi42.isna() & num_cohab_partners.isna(), np.nan, 0))
-    ever_partnered = np.where((ever_married == 1) | (ever_cohabited == 1), 1,
-                              np.where((pd.isna(ever_married)) & (pd.isna(ever_cohabited)), np.nan, 0))
-    age_le_35 = np.where(age <= 35, 1, np.where(age.isna(), np.nan, 0))
-
-    sex_label = np.where(sex==1, "Male", np.where(sex==2, "Female", np.nan))
-
-    # primary cohorts: 5-year bins from observed birth_year among age<=35
-    birth_year_le35 = birth_year[age_le_35 == 1].dropna().astype(int)
-    min_by, max_by = birth_year_le35.min(), birth_year_le35.max()
-    start = (min_by // 5) * 5
-    end = ((max_by // 5) * 5) + 4
-    bins = list(range(start, end+2, 5))
-    labels = [f"{b}-{b+4}" for b in bins[:-1]]
-    primary_cohort = pd.cut(birth_year, bins=bins, right=False, labels=labels, include_lowest=True)
-
-    macro_cohort = birth_year.apply(macro_bin)
-
-    analytic = pd.DataFrame({
-        "age": age,
-        "sex": sex,
-        "sex_label": sex_label,
-        "birth_year": birth_year,
-        "num_marriages": num_marriages,
-        "ever_married": ever_married,
-        "remarried_2plus": remarried_2plus,
-        "num_cohab_partners": num_cohab_partners,
-        "ever_cohabited": ever_cohabited,
-        "ever_partnered": ever_partnered,
-        "age_le_35": age_le_35,
-        "cohort_primary": primary_cohort,
-        "cohort_macro": macro_cohort,
-        "src_age_var": df[age_src],
-        "src_sex_var": df[sex_src],
-        "src_MI40_married_since": df[married_since_src],
-        "src_MI41_times_married_since": df[marriages_src],
-        "src_MI42_cohab_since": df[cohab_since_src],
-        "src_MI140_num_cohab_partners": df[cohab_n_src],
-    })
-
-    out_analytic = out_dir / "NSFH_Wave2_analytic_replication_ready.xlsx"
+    def recode_block(df):
+        age = recode_missing_numeric(df[age_src], COMMON_MISS)
+        sex = recode_missing_numeric(df[sex_src], COMMON_MISS)
+        birth_year = args.interview_year - age
+
+        num_marriages = recode_missing_numeric(df[marriages_src], COMMON_MISS)
+        num_cohab_partners = recode_missing_numeric(df[cohab_n_src], COMMON_MISS)
+
+        mi40 = recode_missing_numeric(df[married_since_src], COMMON_MISS)
+        mi42 = recode_missing_numeric(df[cohab_since_src], COMMON_MISS)
+
+        # Indicators on plain float arrays, so the whole chain stays in NumPy
+        nm, m40 = num_marriages.to_numpy(dtype=float), mi40.to_numpy(dtype=float)
+        ncp, m42 = num_cohab_partners.to_numpy(dtype=float), mi42.to_numpy(dtype=float)
+        a = age.to_numpy(dtype=float)
+        ever_married = np.where((nm >= 1) | (m40 == 1), 1, np.where(np.isnan(m40) & np.isnan(nm), np.nan, 0))
+        remarried_2plus = np.where(nm >= 2, 1, np.where(np.isnan(nm), np.nan, 0))
+        ever_cohabited = np.where((ncp >= 1) | (m42 == 1), 1, np.where(np.isnan(m42) & np.isnan(ncp), np.nan, 0))
+        ever_partnered = np.where((ever_married == 1) | (ever_cohabited == 1), 1,
+                                  np.where(np.isnan(ever_married) & np.isnan(ever_cohabited), np.nan, 0))
+        age_le_35 = np.where(a <= 35, 1, np.where(np.isnan(a), np.nan, 0))
+
+        # Categorical so the table groupbys hash int8 codes; Female first keeps the old (alphabetical) row order
+        sex_label = pd.Categorical.from_codes(np.where(sex==2, 0, np.where(sex==1, 1, -1)).astype("int8"),
+                                              categories=["Female", "Male"])
+
+        macro_cohort = pd.cut(birth_year, bins=MACRO_BINS, labels=MACRO_LABELS, right=True)
+
+        return pd.DataFrame({
+            "age": age,
+            "sex": sex,
+            "sex_label": sex_label,
+            "birth_year": birth_year,
+            "num_marriages": num_marriages,
+            "ever_married": ever_married,
+            "remarried_2plus": remarried_2plus,
+            "num_cohab_partners": num_cohab_partners,
+            "ever_cohabited": ever_cohabited,
+            "ever_partnered": ever_partnered,
+            "age_le_35": age_le_35,
+            "cohort_macro": macro_cohort,
+            **{name: df[v] for name, v in src_audit.items()},
+        })
+
+    def recode_polars():
+        src = pl.read_csv(raw_path, separator="\t", columns=src_vars, infer_schema_length=None)
+        miss_codes = [float(c) for c in COMMON_MISS]
+
+        def recode_missing(v):
+            x = pl.col(v)
+            if src.schema[v] == pl.String:
+                x = x.cast(pl.Float64, strict=False)
+            return pl.when(x.cast(pl.Float64).is_in(miss_codes)).then(None).otherwise(x)
+
+        age, sex, by = pl.col("age"), pl.col("sex"), pl.col("birth_year")
+        nm, ncp, mi40, mi42 = pl.col("num_marriages"), pl.col("num_cohab_partners"), pl.col("mi40"), pl.col("mi42")
+        em, ec = pl.col("ever_married"), pl.col("ever_cohabited")
+        a = src.with_columns(
+            age=recode_missing(age_src),
+            sex=recode_missing(sex_src),
+            num_marriages=recode_missing(marriages_src),
+            num_cohab_partners=recode_missing(cohab_n_src),
+            mi40=recode_missing(married_since_src),
+            mi42=recode_missing(cohab_since_src),
+        ).with_columns(
+            birth_year=args.interview_year - age,
+            ever_married=pl.when((nm >= 1) | (mi40 == 1)).then(1.0).when(mi40.is_null() & nm.is_null()).then(None).otherwise(0.0),
+            remarried_2plus=pl.when(nm >= 2).then(1.0).when(nm.is_null()).then(None).otherwise(0.0),
+            ever_cohabited=pl.when((ncp >= 1) | (mi42 == 1)).then(1.0).when(mi42.is_null() & ncp.is_null()).then(None).otherwise(0.0),
+            age_le_35=pl.when(age <= 35).then(1.0).when(age.is_null()).then(None).otherwise(0.0),
+            sex_label=pl.when(sex == 2).then(pl.lit("Female")).when(sex == 1).then(pl.lit("Male")).cast(pl.Enum(["Female", "Male"])),
+        ).with_columns(
+            ever_partnered=pl.when((em == 1) | (ec == 1)).then(1.0).when(em.is_null() & ec.is_null()).then(None).otherwise(0.0),
+            cohort_macro=pl.when(by <= 1949).then(pl.lit(MACRO_LABELS[0]))
+                           .when(by <= 1959).then(pl.lit(MACRO_LABELS[1]))
+                           .when(by <= 1969).then(pl.lit(MACRO_LABELS[2]))
+                           .when(by <= 1979).then(pl.lit(MACRO_LABELS[3]))
+                           .when(by.is_not_null()).then(pl.lit(MACRO_LABELS[4]))
+                           .cast(pl.Enum(MACRO_LABELS)),
+        )
+
+        bins, labels = primary_bins(a.filter(pl.col("age_le_35") == 1)["birth_year"].drop_nulls().cast(pl.Int64))
+        lo = (bins[0] + ((by - bins[0]) // 5) * 5).cast(pl.Int64)
+        a = a.with_columns(
+            cohort_primary=pl.when((by >= bins[0]) & (by < bins[-1])).then(pl.format("{}-{}", lo, lo + 4)).cast(pl.Enum(labels)),
+        )
+        return a.select(
+            "age", "sex", "sex_label", "birth_year", "num_marriages", "ever_married", "remarried_2plus",
+            "num_cohab_partners", "ever_cohabited", "ever_partnered", "age_le_35", "cohort_primary", "cohort_macro",
+            *[pl.col(v).alias(name) for name, v in src_audit.items()],
+        )
+
+    if args.engine == "polars":
+        analytic_pl = recode_polars()
+        analytic = analytic_pl.to_pandas()
+    else:
+        # With --chunksize the raw file is recoded chunk by chunk, so only the narrow analytic columns are held in full
+        parts = [recode_block(chunk) for chunk in read_tsv_chunks(raw_path, args.chunksize, usecols=src_vars)]
+        analytic = pd.concat(parts, ignore_index=True)
+
+        # primary cohorts: 5-year bins from observed birth_year among age<=35 (needs the whole file)
+        birth_year = analytic["birth_year"]
+        bins, labels = primary_bins(birth_year[analytic["age_le_35"] == 1].dropna().astype(int))
+        primary_cohort = pd.cut(birth_year, bins=bins, right=False, labels=labels, include_lowest=True)
+        analytic.insert(analytic.columns.get_loc("cohort_macro"), "cohort_primary", primary_cohort)
+
+    out_analytic = out_dir / f"NSFH_Wave2_analytic_replication_ready.{args.analytic_format}"
     out_tables = out_dir / "NSFH_Wave2_tables.xlsx"
 
-    with pd.ExcelWriter(out_analytic, engine="openpyxl") as writer:
-        analytic.to_excel(writer, sheet_name="analytic", index=False)
-
-    tab_all = cohort_sex_table(analytic, "cohort_primary", only_present=False, min_n=args.min_n)
-    tab_present = cohort_sex_table(analytic, "cohort_primary", only_present=True, min_n=args.min_n)
+    if args.analytic_format == "parquet":
+        analytic.to_parquet(out_analytic, engine="pyarrow", compression="zstd", index=False)
+    else:
+        write_analytic_xlsx_fast(analytic, out_analytic)
+
+    if args.engine == "polars":
+        tab_all = cohort_sex_table_polars(analytic_pl, "cohort_primary", only_present=False, min_n=args.min_n)
+        tab_present = cohort_sex_table_polars(analytic_pl, "cohort_primary", only_present=True, min_n=args.min_n)
+    else:
+        tab_all = cohort_sex_table(analytic, "cohort_primary", only_present=False, min_n=args.min_n)
+        tab_present = cohort_sex_table(analytic, "cohort_primary", only_present=True, min_n=args.min_n)
     gap = gap_table(tab_present, "cohort_primary")
 
-    with pd.ExcelWriter(out_tables, engine="openpyxl") as writer:
+    with pd.ExcelWriter(out_tables, engine="xlsxwriter") as writer:
         tab_all.to_excel(writer, sheet_name="primary_all", index=False)
         tab_present.to_excel(writer, sheet_name="primary_present", index=False)
         gap.to_excel(writer, sheet_name="ever_partnered_gap", index=False)
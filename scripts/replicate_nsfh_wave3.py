@@ -10,7 +10,7 @@ Expected inputs (TSV):
 - 00171-0002-Data.tsv  (Household roster; contains respondent gender/sex and respondent marital status per NSFH FAQ)
 
 Outputs:
-- NSFH_Wave3_analytic_replication_ready.xlsx  (sheet: analytic)
+- NSFH_Wave3_analytic_replication_ready.parquet (or .xlsx, sheet: analytic, with --analytic_format xlsx)
 - NSFH_Wave3_tables.xlsx                     (sheets: primary_all, primary_present, ever_partnered_gap)
 """
 
@@ -20,6 +20,27 @@ from pathlib import Path
 import pandas as pd
 import numpy as np
 
+from nsfh_groups import encode_groups, group_mean
+from nsfh_xlsx import write_analytic_xlsx_fast
+
+# The multi-threaded pyarrow CSV parser is much faster on the raw TSV; the C parser is the fallback
+try:
+    import pyarrow  # noqa: F401
+    CSV_ENGINE = "pyarrow"
+except ImportError:
+    CSV_ENGINE = "c"
+
+# Optional: --engine polars runs the read/recode/aggregate steps in polars
+try:
+    import polars as pl
+except ImportError:
+    pl = None
+
+PRIMARY_BINS = [-np.inf, 1939, 1949, 1959, 1969, 1979, 1989, 1999, np.inf]
+PRIMARY_LABELS = ["≤1939","1940–49","1950–59","1960–69","1970–79","1980–89","1990–99","≥2000"]
+MACRO_BINS = [-np.inf, 1949, 1959, 1969, 1979, np.inf]
+MACRO_LABELS = ["≤1949","1950–59","1960–69","1970–79","≥1980"]
+
 # ----------------------------
 # Helpers
 # ----------------------------
@@ -30,6 +51,19 @@ def _clean_str(s: pd.Series) -> pd.Series:
 def _to_num(s: pd.Series) -> pd.Series:
     return pd.to_numeric(_clean_str(s), errors="coerce")
 
+def read_tsv_chunks(path: Path, chunksize: int | None, **kwargs):
+    """Read a TSV as a sequence of DataFrame chunks.
+
+    With chunksize None the (usecols-narrowed) file comes back as a single chunk, parsed
+    by pyarrow when available. pyarrow has no chunksize, so a chunked read always goes
+    through the C parser, chunksize rows at a time.
+    """
+    if chunksize is None:
+        if CSV_ENGINE == "pyarrow":
+            return [pd.read_csv(path, sep="\t", engine="pyarrow", **kwargs)]
+        return [pd.read_csv(path, sep="\t", low_memory=False, **kwargs)]
+    return pd.read_csv(path, sep="\t", low_memory=False, chunksize=chunksize, **kwargs)
+
 def find_col(df: pd.DataFrame, candidates: list[str]) -> str | None:
     cols_upper = {c.upper(): c for c in df.columns}
     for cand in candidates:
@@ -42,47 +76,59 @@ def find_col(df: pd.DataFrame, candidates: list[str]) -> str | None:
                 return c
     return None
 
+def _day_number(y, m, d):
+    """Julian day number of a (year, month, day) date; plain arithmetic, so it works on
+    float arrays (NaN propagates) and polars expressions alike."""
+    a = (14 - m) // 12
+    y, m = y + 4800 - a, m + 12 * a - 3
+    return d + (153 * m + 2) // 5 + 365 * y + y // 4 - y // 100 + y // 400 - 32045
+
 def compute_age(dob_year2: pd.Series, dob_month: pd.Series, int_year: pd.Series, int_month: pd.Series, int_day: pd.Series) -> pd.Series:
     """
     DOBY in DS0001 is 2-digit year. We map it to 1900+DOBY by default.
     Age is computed using interview date and (month, year) DOB; day is assumed 15 (mid-month) since DOB day isn't provided.
+    All inputs are already numeric (see _to_num).
     """
-    y2 = _to_num(dob_year2)
-    m = _to_num(dob_month)
-    iy = _to_num(int_year)
-    im = _to_num(int_month)
-    iday = _to_num(int_day)
-
     # Map DOBY to 4-digit: assume 1900s by default.
-    by = 1900 + y2
+    by = 1900 + dob_year2
+
+    # Day-of-birth not present; assume 15th. Missing months default to June, a missing
+    # interview day to the 15th; components are truncated to whole numbers.
+    m = np.trunc(dob_month.fillna(6))
+    iy = np.trunc(int_year)
+    im = np.trunc(int_month.fillna(6))
+    iday = np.trunc(int_day.fillna(15))
 
-    # Construct dates
-    # Day-of-birth not present; assume 15th.
-    dob = pd.to_datetime(dict(year=by, month=m.fillna(6).astype(int), day=15), errors="coerce")
-    iv = pd.to_datetime(dict(year=iy.astype(int), month=im.fillna(6).astype(int), day=iday.fillna(15).astype(int)), errors="coerce")
+    # Dates as integer day numbers instead of datetimes; same floor(days / 365.25) age
+    days = _day_number(iy, im, iday) - _day_number(by, m, 15)
+    age = np.floor(days / 365.25)
 
-    age = np.floor((iv - dob).dt.days / 365.25)
-    return age
+    # Impossible dates give NaN, as pd.to_datetime(errors="coerce") did
+    month_len = _day_number(iy + im // 12, im % 12 + 1, 1) - _day_number(iy, im, 1)
+    valid = m.between(1, 12) & im.between(1, 12) & (iday >= 1) & (iday <= month_len)
+    return age.where(valid)
 
 def sex_label_from_code(sex: pd.Series) -> pd.Series:
-    return sex.map({1: "Male", 2: "Female"})
+    return sex.map({1: "Male", 2: "Female"}).astype(pd.CategoricalDtype(["Female", "Male"]))
 
 def make_primary_cohort(birth_year: pd.Series) -> pd.Categorical:
     """
     Start with Wave-1-like 10-year bins; adjust only if sample support forces it.
     Here we implement 1940-49, 1950-59, 1960-69, 1970-79, 1980-89, 1990-99 (as needed).
     """
-    bins = [-np.inf, 1939, 1949, 1959, 1969, 1979, 1989, 1999, np.inf]
-    labels = ["≤1939","1940–49","1950–59","1960–69","1970–79","1980–89","1990–99","≥2000"]
-    return pd.cut(birth_year, bins=bins, labels=labels, right=True, ordered=True)
+    return pd.cut(birth_year, bins=PRIMARY_BINS, labels=PRIMARY_LABELS, right=True, ordered=True)
 
 def make_macro_cohort(birth_year: pd.Series) -> pd.Categorical:
-    bins = [-np.inf, 1949, 1959, 1969, 1979, 1979, 1979, 1979, np.inf]  # placeholder; overwritten below
     # Use required macro cohorts:
     # ≤1949, 1950–59, 1960–69, 1970–79, ≥1980
-    bins = [-np.inf, 1949, 1959, 1969, 1979, np.inf]
-    labels = ["≤1949","1950–59","1960–69","1970–79","≥1980"]
-    return pd.cut(birth_year, bins=bins, labels=labels, right=True, ordered=True)
+    return pd.cut(birth_year, bins=MACRO_BINS, labels=MACRO_LABELS, right=True, ordered=True)
+
+def cut_polars(x, bins: list[float], labels: list[str]):
+    """pd.cut(x, bins, labels, right=True) for bins running from -inf to inf, as a polars expression."""
+    out = pl.when(x <= bins[1]).then(pl.lit(labels[0]))
+    for edge, label in zip(bins[2:-1], labels[1:-1]):
+        out = out.when(x <= edge).then(pl.lit(label))
+    return out.when(x.is_not_null()).then(pl.lit(labels[-1])).cast(pl.Enum(labels))
 
 # ----------------------------
 # Main
@@ -94,7 +140,23 @@ def main():
     ap.add_argument("--wave3_roster_tsv", type=str, default="00171-0002-Data.tsv")
     ap.add_argument("--out_dir", type=str, default=".")
     ap.add_argument("--interview_year_mode", type=int, default=2002, help="Use modal Wave 3 interview year for birth_year construction (default 2002).")
+    ap.add_argument("--analytic_format", choices=["parquet", "xlsx"], default="parquet",
+                    help="Format of the analytic extract (parquet is much faster to write and read).")
+    ap.add_argument("--chunksize", type=int, default=None,
+                    help="Read and recode the main TSV this many rows at a time to bound peak memory "
+                         "(default: the whole file in one pass; a chunked read uses the C parser).")
+    ap.add_argument("--engine", choices=["pandas", "polars"], default="pandas",
+                    help="Library used to read, recode and aggregate (polars parallelizes these steps).")
+    ap.add_argument("--include_raw_audit", action="store_true",
+                    help="Carry the raw source variables into the analytic extract for auditing.")
     args = ap.parse_args()
+    if args.engine == "polars" and pl is None:
+        ap.error("--engine polars requires the polars package")
+    if args.chunksize is not None:
+        if args.engine == "polars":
+            ap.error("--chunksize applies to the pandas engine only")
+        if CSV_ENGINE == "pyarrow":
+            print(f"--chunksize {args.chunksize}: reading in chunks with the C parser instead of pyarrow's one-pass parse")
 
     out_dir = Path(args.out_dir)
     out_dir.mkdir(parents=True, exist_ok=True)
@@ -110,20 +172,17 @@ def main():
             "NSFH FAQ indicates respondent gender and marital status in Wave 3 are in the household roster file."
         )
 
-    # Load
-    df_main = pd.read_csv(main_path, sep="\t", low_memory=False, dtype=str)
-    df_roster = pd.read_csv(roster_path, sep="\t", low_memory=False, dtype=str)
-
-    # Keep main respondents only (TYPE == 'R') to match Wave 1/2 respondent universe.
-    if "TYPE" in df_main.columns:
-        df_main = df_main[df_main["TYPE"].astype(str).str.strip().eq("R")].copy()
+    # Column names are resolved on an empty merge of the two headers, so that only the
+    # columns used below are parsed from the (wide) TSVs
+    main_header = pd.read_csv(main_path, sep="\t", nrows=0, dtype=str)
+    roster_header = pd.read_csv(roster_path, sep="\t", nrows=0, dtype=str)
 
     # Merge on CASENUM (numeric case id) if possible, else CASEID
-    key_main = "CASENUM" if "CASENUM" in df_main.columns else ("CASEID" if "CASEID" in df_main.columns else None)
-    key_roster = "CASENUM" if "CASENUM" in df_roster.columns else ("CASEID" if "CASEID" in df_roster.columns else None)
+    key_main = "CASENUM" if "CASENUM" in main_header.columns else ("CASEID" if "CASEID" in main_header.columns else None)
+    key_roster = "CASENUM" if "CASENUM" in roster_header.columns else ("CASEID" if "CASEID" in roster_header.columns else None)
     if key_main is None or key_roster is None:
         raise ValueError("Could not find a merge key in both files (CASENUM or CASEID).")
-    df = df_main.merge(df_roster, left_on=key_main, right_on=key_roster, how="left", suffixes=("", "_roster"))
+    df = main_header.merge(roster_header, left_on=key_main, right_on=key_roster, how="left", suffixes=("", "_roster"))
 
     # Identify required columns
     dobm = find_col(df, ["DOBM"])
@@ -145,113 +204,217 @@ def main():
     if missing_cols:
         raise ValueError(
             f"Missing required columns after merge: {missing_cols}\n"
-            f"Found columns in roster: {list(df_roster.columns)[:50]} ...\n"
+            f"Found columns in roster: {list(roster_header.columns)[:50]} ...\n"
             "If the roster variable names differ, add them to the candidate lists in find_col()."
         )
 
-    # Construct age from DOB + interview date
-    age = compute_age(df[doby], df[dobm], df[idatyy], df[idatmm], df[idatdd])
-
-    sex = _to_num(df[sex_col])
-    # Standardize to 1=Male,2=Female if codebook uses that; otherwise user must adjust mapping.
-    sex_label = sex_label_from_code(sex)
-
-    interview_year = args.interview_year_mode
-    birth_year = interview_year - age
-
-    # Marriages: infer from marital status (ever married) and "first marriage" flag where available.
-    ms = _to_num(df[ms_col])
-    mb = _to_num(df[mb_col]) if mb_col else pd.Series(np.nan, index=df.index)
-
-    # Expect ms codes: 1 married, 2 separated, 3 divorced, 4 widowed, 5 never married.
-    ever_married = ms.isin([1,2,3,4]).astype(float)
-    # remarried indicator only meaningful among currently/ever married; use mb==2 ("married before") when available.
-    remarried_2plus = ((ever_married == 1) & (mb == 2)).astype(float)
-
-    # Build num_marriages to match Wave 1 variable structure; when only indicator info exists, set to {0,1,2}
-    num_marriages = pd.Series(np.nan, index=df.index, dtype="float")
-    num_marriages.loc[ever_married==0] = 0
-    num_marriages.loc[(ever_married==1) & (remarried_2plus==0)] = 1
-    num_marriages.loc[remarried_2plus==1] = 2
-
-    # Cohabitation partners: Wave 3 does not reliably include a lifetime count in the respondent file set used here.
-    # Provide NA for num_cohab_partners unless an explicit count is present.
-    num_cohab_partners = pd.Series(np.nan, index=df.index, dtype="float")
+    # Load only the resolved columns, merge keys and TYPE. Main columns that share a name with
+    # a loaded roster column are kept too, so the merged names (and _roster suffixes) don't change.
+    needed = {c for c in [dobm, doby, idatyy, idatmm, idatdd, sex_col, ms_col, mb_col, coh_col] if c}
+    roster_cols = [c for c in roster_header.columns if c == key_roster or c in needed or f"{c}_roster" in needed]
+    main_cols = [c for c in main_header.columns if c in (key_main, "TYPE") or c in needed or c in roster_cols]
+
+    # raw audit columns (--include_raw_audit): output name -> source column (None when the roster lacks it)
+    raw_audit = {
+        "raw_DOBM": dobm, "raw_DOBY": doby, "raw_IDATYY": idatyy, "raw_IDATMM": idatmm, "raw_IDATDD": idatdd,
+        f"raw_{sex_col}": sex_col, f"raw_{ms_col}": ms_col, f"raw_{mb_col}": mb_col, f"raw_{coh_col}": coh_col,
+    } if args.include_raw_audit else {}
+
+    def recode_block(df_main: pd.DataFrame) -> pd.DataFrame:
+        # Keep main respondents only (TYPE == 'R') to match Wave 1/2 respondent universe.
+        if "TYPE" in df_main.columns:
+            df_main = df_main[df_main["TYPE"].astype(str).str.strip().eq("R")].copy()
+
+        df = df_main.merge(df_roster, left_on=key_main, right_on=key_roster, how="left", suffixes=("", "_roster"))
+
+        # Clean each source column once; the recodes and the raw audit columns share these.
+        num = {c: _to_num(df[c]) for c in needed}
+
+        # Construct age from DOB + interview date
+        age = compute_age(num[doby], num[dobm], num[idatyy], num[idatmm], num[idatdd])
+
+        sex = num[sex_col]
+        # Standardize to 1=Male,2=Female if codebook uses that; otherwise user must adjust mapping.
+        sex_label = sex_label_from_code(sex)
+
+        interview_year = args.interview_year_mode
+        birth_year = interview_year - age
+
+        # Marriages: infer from marital status (ever married) and "first marriage" flag where available.
+        ms = num[ms_col]
+        mb = num[mb_col] if mb_col else pd.Series(np.nan, index=df.index)
+
+        # Expect ms codes: 1 married, 2 separated, 3 divorced, 4 widowed, 5 never married.
+        ever_married = ms.isin([1,2,3,4]).astype(float)
+        # remarried indicator only meaningful among currently/ever married; use mb==2 ("married before") when available.
+        remarried_2plus = ((ever_married == 1) & (mb == 2)).astype(float)
+
+        # Build num_marriages to match Wave 1 variable structure; when only indicator info exists, set to {0,1,2}
+        num_marriages = pd.Series(np.select(
+            [ever_married.eq(0), ever_married.eq(1) & remarried_2plus.eq(0), remarried_2plus.eq(1)],
+            [0.0, 1.0, 2.0], default=np.nan,
+        ), index=df.index)
+
+        # Cohabitation partners: Wave 3 does not reliably include a lifetime count in the respondent file set used here.
+        # Provide NA for num_cohab_partners unless an explicit count is present.
+        num_cohab_partners = pd.Series(np.nan, index=df.index, dtype="float")
+
+        # ever_cohabited: if a cohab status variable exists, use YES(1) as indicator (this is "currently living with a partner" in some rosters)
+        if coh_col:
+            coh = num[coh_col]
+            ever_cohabited = coh.eq(1).astype(float)
+        else:
+            ever_cohabited = pd.Series(np.nan, index=df.index, dtype="float")
+
+        ever_partnered = ((ever_married==1) | (ever_cohabited==1)).astype(float)
+
+        age_le_35 = age.le(35).astype(float)
+
+        primary_cohort = make_primary_cohort(birth_year)
+        macro_cohort = make_macro_cohort(birth_year)
+
+        return pd.DataFrame({
+            "caseid": df[key_main].astype(str).str.strip(),
+            "interview_year_mode": interview_year,
+            "age": age,
+            "sex": sex,
+            "sex_label": sex_label,
+            "birth_year": birth_year,
+            "num_marriages": num_marriages,
+            "ever_married": ever_married,
+            "remarried_2plus": remarried_2plus,
+            "num_cohab_partners": num_cohab_partners,
+            "ever_cohabited": ever_cohabited,
+            "ever_partnered": ever_partnered,
+            "age_le_35": age_le_35,
+            "primary_cohort": primary_cohort,
+            "macro_cohort": macro_cohort,
+            **{name: num[c] if c else np.nan for name, c in raw_audit.items()},
+        })
+
+    def recode_polars():
+        df_main = pl.read_csv(main_path, separator="\t", columns=main_cols, infer_schema=False)
+        df_roster = pl.read_csv(roster_path, separator="\t", columns=roster_cols, infer_schema=False)
+
+        # Keep main respondents only (TYPE == 'R') to match Wave 1/2 respondent universe.
+        if "TYPE" in df_main.columns:
+            df_main = df_main.filter(pl.col("TYPE").str.strip_chars() == "R")
+
+        # NaN keys match in pandas' merge, hence nulls_equal
+        df = df_main.join(df_roster, left_on=key_main, right_on=key_roster, how="left", suffix="_roster",
+                          nulls_equal=True, maintain_order="left")
+        # Clean each source column once, as _to_num does: blanks and "." (anything non-numeric) become null
+        df = df.with_columns(pl.col(c).str.strip_chars().cast(pl.Float64, strict=False) for c in needed)
+
+        def num(c):
+            return pl.col(c) if c else pl.lit(None, pl.Float64)
+
+        # Same age rule as compute_age
+        m, im, iday = (num(c).fill_null(v).truncate() for c, v in [(dobm, 6), (idatmm, 6), (idatdd, 15)])
+        iy = num(idatyy).truncate()
+        days = _day_number(iy, im, iday) - _day_number(1900 + num(doby), m, 15)
+        month_len = _day_number(iy + im // 12, im % 12 + 1, 1) - _day_number(iy, im, 1)
+        age_expr = pl.when(m.is_between(1, 12) & im.is_between(1, 12) & (iday >= 1) & (iday <= month_len)).then(
+            (days / 365.25).floor())
+
+        interview_year = args.interview_year_mode
+        age, sex, by = pl.col("age"), pl.col("sex"), pl.col("birth_year")
+        em, rem, ec = pl.col("ever_married"), pl.col("remarried_2plus"), pl.col("ever_cohabited")
+        a = df.with_columns(
+            age=age_expr,
+            sex=num(sex_col),
+            # Expect ms codes: 1 married, 2 separated, 3 divorced, 4 widowed, 5 never married.
+            ever_married=num(ms_col).is_in([1.0, 2.0, 3.0, 4.0]).fill_null(False).cast(pl.Float64),
+            ever_cohabited=(num(coh_col) == 1).fill_null(False).cast(pl.Float64) if coh_col else pl.lit(None, pl.Float64),
+        ).with_columns(
+            birth_year=interview_year - age,
+            remarried_2plus=((em == 1) & (num(mb_col) == 2)).fill_null(False).cast(pl.Float64),
+            ever_partnered=((em == 1) | (ec == 1)).fill_null(False).cast(pl.Float64),
+            age_le_35=(age <= 35).fill_null(False).cast(pl.Float64),
+            sex_label=pl.when(sex == 1).then(pl.lit("Male")).when(sex == 2).then(pl.lit("Female")).cast(pl.Enum(["Female", "Male"])),
+        )
+        return a.select(
+            caseid=pl.col(key_main).str.strip_chars(),
+            interview_year_mode=pl.lit(interview_year, pl.Int64),
+            age=age,
+            sex=sex,
+            sex_label="sex_label",
+            birth_year=by,
+            num_marriages=pl.when(em == 0).then(0.0).when(rem == 0).then(1.0).when(rem == 1).then(2.0),
+            ever_married=em,
+            remarried_2plus=rem,
+            num_cohab_partners=pl.lit(None, pl.Float64),
+            ever_cohabited=ec,
+            ever_partnered="ever_partnered",
+            age_le_35="age_le_35",
+            primary_cohort=cut_polars(by, PRIMARY_BINS, PRIMARY_LABELS),
+            macro_cohort=cut_polars(by, MACRO_BINS, MACRO_LABELS),
+            **{name: num(c) for name, c in raw_audit.items()},
+        )
 
-    # ever_cohabited: if a cohab status variable exists, use YES(1) as indicator (this is "currently living with a partner" in some rosters)
-    if coh_col:
-        coh = _to_num(df[coh_col])
-        ever_cohabited = coh.eq(1).astype(float)
+    if args.engine == "polars":
+        analytic_pl = recode_polars()
+        analytic = analytic_pl.to_pandas()
     else:
-        ever_cohabited = pd.Series(np.nan, index=df.index, dtype="float")
-
-    ever_partnered = ((ever_married==1) | (ever_cohabited==1)).astype(float)
-
-    age_le_35 = age.le(35).astype(float)
-
-    primary_cohort = make_primary_cohort(birth_year)
-    macro_cohort = make_macro_cohort(birth_year)
-
-    analytic = pd.DataFrame({
-        "caseid": df[key_main].astype(str).str.strip(),
-        "interview_year_mode": interview_year,
-        "age": age,
-        "sex": sex,
-        "sex_label": sex_label,
-        "birth_year": birth_year,
-        "num_marriages": num_marriages,
-        "ever_married": ever_married,
-        "remarried_2plus": remarried_2plus,
-        "num_cohab_partners": num_cohab_partners,
-        "ever_cohabited": ever_cohabited,
-        "ever_partnered": ever_partnered,
-        "age_le_35": age_le_35,
-        "primary_cohort": primary_cohort.astype(str),
-        "macro_cohort": macro_cohort.astype(str),
-        # raw audit columns
-        "raw_DOBM": _to_num(df[dobm]),
-        "raw_DOBY": _to_num(df[doby]),
-        "raw_IDATYY": _to_num(df[idatyy]),
-        "raw_IDATMM": _to_num(df[idatmm]),
-        "raw_IDATDD": _to_num(df[idatdd]),
-        f"raw_{sex_col}": _to_num(df[sex_col]),
-        f"raw_{ms_col}": _to_num(df[ms_col]),
-        f"raw_{mb_col}": _to_num(df[mb_col]) if mb_col else np.nan,
-        f"raw_{coh_col}": _to_num(df[coh_col]) if coh_col else np.nan,
-    })
+        df_roster = pd.read_csv(roster_path, sep="\t", engine=CSV_ENGINE, dtype=str, usecols=roster_cols)
+        # With --chunksize the main file is streamed in chunks, merging the (narrow) roster onto
+        # each; only the recoded analytic columns are held for the whole file
+        parts = [recode_block(chunk) for chunk in read_tsv_chunks(main_path, args.chunksize, dtype=str, usecols=main_cols)]
+        analytic = pd.concat(parts, ignore_index=True)
 
     # ----------------------------
     # Tables (age <= 35, cohort x sex)
     # ----------------------------
-    a35 = analytic[analytic["age_le_35"]==1].copy()
 
     def cohort_table(data: pd.DataFrame) -> pd.DataFrame:
-        # partnered denominator
-        partnered = data[data["ever_partnered"]==1].copy()
+        keys = ["primary_cohort","sex"]
+        gid, out = encode_groups(data, keys)
+        ng = len(out)
+
+        # N and P(ever partnered)
+        ever_partnered = data["ever_partnered"].to_numpy(dtype=float)
+        out["N"] = np.bincount(gid, minlength=ng)
+        out["p_ever_partnered"] = group_mean(ever_partnered, gid, ng)
+
+        # Means | partnered (# cohab partners will be NA in Wave 3 under this file set);
+        # rows outside the partnered denominator are NaN so they drop out of the mean
+        partnered = ever_partnered == 1
+        for name, col in [("mean_num_cohab_partners_given_partnered", "num_cohab_partners"),
+                          ("mean_num_marriages_given_partnered", "num_marriages"),
+                          ("p_remarried_2plus_given_partnered", "remarried_2plus")]:
+            out[name] = group_mean(np.where(partnered, data[col].to_numpy(dtype=float), np.nan), gid, ng)
+
+        # Groups with a missing key (e.g. no roster match) only report N
+        out.loc[out[keys].isna().any(axis=1), out.columns[len(keys) + 1:]] = np.nan
 
-        gN = data.groupby(["primary_cohort","sex"], dropna=False).size().rename("N").reset_index()
-
-        # P(ever partnered)
-        p_partnered = data.groupby(["primary_cohort","sex"])["ever_partnered"].mean().rename("p_ever_partnered").reset_index()
-
-        # Mean # cohab partners | partnered (will be NA in Wave 3 under this file set)
-        mean_coh = partnered.groupby(["primary_cohort","sex"])["num_cohab_partners"].mean().rename("mean_num_cohab_partners_given_partnered").reset_index()
-
-        # Mean # marriages | partnered
-        mean_mar = partnered.groupby(["primary_cohort","sex"])["num_marriages"].mean().rename("mean_num_marriages_given_partnered").reset_index()
+        out["sex_label"] = out["sex"].map({1:"Male",2:"Female"})
+        return out.sort_values(["primary_cohort","sex"])
 
-        # P(remarried 2+ | partnered)
-        p_rem2 = partnered.groupby(["primary_cohort","sex"])["remarried_2plus"].mean().rename("p_remarried_2plus_given_partnered").reset_index()
+    def cohort_table_polars(data) -> pd.DataFrame:
+        keys = ["primary_cohort","sex"]
+        out = data.group_by(keys).agg(
+            N=pl.len().cast(pl.Int64),
+            p_ever_partnered=pl.col("ever_partnered").mean(),
+        )
+        # Groups with a missing key (e.g. no roster match) only report N
+        out = out.with_columns(p_ever_partnered=pl.when(pl.all_horizontal(pl.col(keys).is_not_null())).then("p_ever_partnered"))
 
-        out = gN.merge(p_partnered, on=["primary_cohort","sex"], how="left") \
-                .merge(mean_coh, on=["primary_cohort","sex"], how="left") \
-                .merge(mean_mar, on=["primary_cohort","sex"], how="left") \
-                .merge(p_rem2, on=["primary_cohort","sex"], how="left")
+        agg_p = data.filter(pl.col("ever_partnered") == 1).drop_nulls(keys).group_by(keys).agg(
+            mean_num_cohab_partners_given_partnered=pl.col("num_cohab_partners").mean(),
+            mean_num_marriages_given_partnered=pl.col("num_marriages").mean(),
+            p_remarried_2plus_given_partnered=pl.col("remarried_2plus").mean(),
+        )
 
-        out["sex_label"] = out["sex"].map({1:"Male",2:"Female"})
-        return out.sort_values(["primary_cohort","sex"])
+        out = out.join(agg_p, on=keys, how="left").with_columns(
+            sex_label=pl.when(pl.col("sex") == 1).then(pl.lit("Male")).when(pl.col("sex") == 2).then(pl.lit("Female")),
+        )
+        return out.sort(keys, nulls_last=True).to_pandas()
 
-    primary_all = cohort_table(a35)
+    if args.engine == "polars":
+        primary_all = cohort_table_polars(analytic_pl.filter(pl.col("age_le_35") == 1))
+    else:
+        a35 = analytic[analytic["age_le_35"]==1]
+        primary_all = cohort_table(a35)
 
     # primary_present: keep cohorts where both sexes have N>=200 (threshold can be adjusted)
     thresh = 200
@@ -264,18 +427,20 @@ def main():
     gap = (gap[2] - gap[1]).rename("female_minus_male_gap_p_ever_partnered").reset_index()
 
     # Write Excel outputs
-    analytic_xlsx = out_dir / "NSFH_Wave3_analytic_replication_ready.xlsx"
+    analytic_out = out_dir / f"NSFH_Wave3_analytic_replication_ready.{args.analytic_format}"
     tables_xlsx = out_dir / "NSFH_Wave3_tables.xlsx"
 
-    with pd.ExcelWriter(analytic_xlsx, engine="openpyxl") as xw:
-        analytic.to_excel(xw, sheet_name="analytic", index=False)
+    if args.analytic_format == "parquet":
+        analytic.to_parquet(analytic_out, engine="pyarrow", compression="zstd", index=False)
+    else:
+        write_analytic_xlsx_fast(analytic, analytic_out)
 
-    with pd.ExcelWriter(tables_xlsx, engine="openpyxl") as xw:
+    with pd.ExcelWriter(tables_xlsx, engine="xlsxwriter") as xw:
         primary_all.to_excel(xw, sheet_name="primary_all", index=False)
         primary_present.to_excel(xw, sheet_name="primary_present", index=False)
         gap.to_excel(xw, sheet_name="ever_partnered_gap", index=False)
 
-    print(f"Wrote: {analytic_xlsx}")
+    print(f"Wrote: {analytic_out}")
     print(f"Wrote: {tables_xlsx}")
 
 if __name__ == "__main__":
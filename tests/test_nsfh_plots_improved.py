@@ -0,0 +1,50 @@
+import importlib
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+SCRIPTS = Path(__file__).resolve().parent.parent / "scripts"
+
+
+def _import_plots(tmp_path, monkeypatch):
+    # The module creates figures_improved/ in the working directory on import
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.syspath_prepend(str(SCRIPTS))
+    sys.modules.pop("nsfh_plots_improved", None)
+    return importlib.import_module("nsfh_plots_improved")
+
+
+def _by_wave_table():
+    # Same dtypes replicate_nsfh_stacked.py writes: categorical keys, nullable Float64 means.
+    # The 1960-64 cohort has no Male row, so the by-sex pivots get missing cells.
+    return pd.DataFrame({
+        "wave": pd.Categorical(["wave2"] * 5),
+        "cohort_primary": pd.Categorical(["1950-54", "1950-54", "1955-59", "1955-59", "1960-64"], ordered=True),
+        "sex_label": pd.Categorical(["Female", "Male", "Female", "Male", "Female"]),
+        "N_age_le_35": np.array([300, 280, 350, 320, 400], dtype="int64"),
+        "p_ever_partnered": pd.array([0.80, 0.70, 0.75, None, 0.60], dtype="Float64"),
+        "mean_marriages_if_partnered": pd.array([1.1, 1.0, 1.05, 1.0, 1.0], dtype="Float64"),
+        "p_remarried_2plus_if_partnered": pd.array([0.10, 0.08, 0.05, 0.04, 0.02], dtype="Float64"),
+    })
+
+
+def test_plots_from_parquet_source(tmp_path, monkeypatch):
+    plots = _import_plots(tmp_path, monkeypatch)
+    _by_wave_table().to_parquet(plots.TABLES_PARQUET, index=False)
+
+    df = plots.load_wave2_tables()
+    assert (df[plots.PLOT_VALUES].dtypes == "float64").all()
+
+    ci = plots.compute_ci(df)
+    assert ci.to_numpy().dtype == np.float64
+    assert np.isnan(ci[("lo", "Male")].iloc[2])
+
+    gap = plots.compute_gap(df)
+    fig = plots.new_figure()
+    plots.plot_ever_partnered(df, fig, ci=ci)
+    plots.plot_partnership_gap(df, fig, gap=gap)
+    plots.plot_marriages_remarriage(df, fig)
+    plots.plot_combined_summary(df, fig, ci=ci, gap=gap)
+    assert (tmp_path / "figures_improved" / "nsfh_combined_summary.png").exists()